@@ -0,0 +1,44 @@
+from autogen import ConversableAgent
+from backend.tools.llm_client import llm_client
+
+class GeminiAgent(ConversableAgent):
+    """ConversableAgent that answers through the shared, pooled Gemini client"""
+
+    # Used by generate_reply when called without messages
+    default_prompt = "Ready."
+
+    def __init__(self, name: str, system_message: str, client=llm_client):
+        # AutoGen doesn't natively support Gemini, so replies go through generate_reply
+        super().__init__(
+            name=name,
+            system_message=system_message,
+            llm_config=False,  # Disable default LLM config
+            human_input_mode="NEVER",  # This agent works automatically
+            max_consecutive_auto_reply=1
+        )
+        self.llm = client
+
+    def generate(self, prompt: str, timeout: float = None, hedge: bool = None, deadline=None) -> str:
+        """Call the LLM, bounded by the request deadline when one is given.
+
+        A deadline that is cancelled mid-call (budget spent, client gone)
+        stops hedging and any attempt still queued in the pool."""
+        if deadline is None:
+            return self.llm.generate(prompt, timeout=timeout, hedge=hedge)
+        deadline.check()
+        timeout = deadline.remaining() if timeout is None else min(timeout, deadline.remaining())
+        return self.llm.generate(prompt, timeout=timeout, hedge=hedge,
+                                 cancelled=lambda: deadline.expired)
+
+    def generate_reply(self, messages=None, sender=None, config=None):
+        """Override the generate_reply method to use Gemini API"""
+        try:
+            if messages:
+                last_message = messages[-1]["content"] if isinstance(messages[-1], dict) else str(messages[-1])
+            else:
+                last_message = self.default_prompt
+
+            return self.generate(last_message)
+
+        except Exception as e:
+            return f"Error generating response: {str(e)}"
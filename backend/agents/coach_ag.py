@@ -1,17 +1,9 @@
-from autogen import ConversableAgent
-import os
-from dotenv import load_dotenv
-import google.generativeai as genai
+from backend.agents.base_ag import GeminiAgent
 
-load_dotenv(".env", override=True)
+class CoachAgent(GeminiAgent):
+    default_prompt = "Ready to provide personalized productivity coaching."
 
-API_KEY = os.getenv("GEMINI_API_KEY")
-
-class CoachAgent(ConversableAgent):
     def __init__(self, name="CoachAgent"):
-        if not API_KEY:
-            raise ValueError("GEMINI_API_KEY not found in environment variables. Please check your .env file.")
-        genai.configure(api_key=API_KEY)
         super().__init__(
             name=name,
             system_message="""You are a CoachAgent that provides personalized, motivating productivity advice.
@@ -22,36 +14,20 @@ class CoachAgent(ConversableAgent):
             - Maintain an encouraging, supportive tone
             - Focus on sustainable productivity improvements
             
-            Always personalize advice based on user's unique patterns and goals.""",
-            
-            llm_config=False,
-            human_input_mode="NEVER",
-            max_consecutive_auto_reply=1
+            Always personalize advice based on user's unique patterns and goals."""
         )
-        
-        self.model = genai.GenerativeModel('gemini-2.5-flash')
-    
-    def generate_reply(self, messages=None, sender=None, config=None):
-        """Override the generate_reply method to use Gemini API"""
-        try:
-            if messages:
-                last_message = messages[-1]["content"] if isinstance(messages[-1], dict) else str(messages[-1])
-            else:
-                last_message = "Ready to provide personalized productivity coaching."
-            
-            response = self.model.generate_content(last_message)
-            return response.text
-            
-        except Exception as e:
-            return f"Error generating response: {str(e)}"
 
-    def coach(self, insight_summary: str, user_history: str = None) -> dict:
-        """Provide personalized coaching based on insights and history"""
+    def coach(self, insight_summary: str, user_history: str = None, schedule: str = None,
+              deadline=None) -> dict:
+        """Provide personalized coaching based on insights, history and calendar shape"""
         prompt = f"""
         Provide personalized productivity coaching based on:
         
         User History: {user_history or "No previous history available"}
         Current Week Insights: {insight_summary}
+        Focus Time & Free Slots (per day): {schedule or "Not available"}
+        
+        When suggesting focus blocks, prefer the listed free slots.
         
         Generate coaching advice in this format:
         {{
@@ -73,10 +49,10 @@ class CoachAgent(ConversableAgent):
         """
         
         try:
-            response = self.model.generate_content(prompt)
+            response = self.generate(prompt, deadline=deadline)
             return {
                 "status": "success",
-                "coaching": response.text,
+                "coaching": response,
                 "based_on": insight_summary
             }
         except Exception as e:
@@ -1,19 +1,58 @@
 from autogen import ConversableAgent
 from backend.tools import google_calendar, github, gmail
+from backend.tools.event_store import event_store
+from backend.tools.event_archive import event_archive, check_user_id
+from backend.tools.rollups import rollups as daily_rollups
 import os
+import time
 from dotenv import load_dotenv
 
 load_dotenv(".env", override=True)
 
 API_KEY = os.getenv("GEMINI_API_KEY")
+# Skip the upstream call entirely if a source was synced this recently
+SYNC_MIN_INTERVAL = float(os.getenv("SYNC_MIN_INTERVAL", 60))
+
+SOURCES = {
+    "calendar": google_calendar.fetch_events,
+    "github": github.fetch_activity,
+    "email": gmail.fetch_email_metadata,
+}
 
 class DataFetcherAgent(ConversableAgent):
-    def __init__(self, name="DataFetcherAgent"):
+    def __init__(self, name="DataFetcherAgent", store=event_store, archive=event_archive,
+                 rollups=daily_rollups):
         super().__init__(name=name)
+        self.store = store
+        self.archive = archive
+        self.rollups = rollups
+
+    def sync(self, user_id: str, force: bool = False) -> dict:
+        """Pull only the deltas since each source's cursor into the local store."""
+        # Reject ids the archive can't store before any cursor moves
+        check_user_id(user_id)
+        report = {}
+        for source, fetch in SOURCES.items():
+            cursor = self.store.get_cursor(user_id, source)
+            if cursor and not force and time.time() - cursor["synced_at"] < SYNC_MIN_INTERVAL:
+                self.store.stats["skipped_syncs"] += 1
+                report[source] = {"fetched": 0, "new": 0, "skipped": True}
+                continue
+            delta = fetch(user_id, since=cursor["last_seen"] if cursor else None)
+            new = self.store.merge(user_id, source, delta)
+            # The archive skips ids it already holds, so a re-fetch after a
+            # restart (empty store, every event "new") isn't archived twice;
+            # rollups count only what the archive accepted, matching a backfill
+            archived = self.archive.append(user_id, source, new)
+            self.rollups.ingest_events(user_id, source, archived)
+            report[source] = {"fetched": len(delta), "new": len(new), "skipped": False}
+        return report
 
-    def fetch_all_logs(self, user_id: str) -> dict:
+    def fetch_all_logs(self, user_id: str, days: int = 7) -> dict:
+        self.sync(user_id)
         return {
-            "calendar": google_calendar.fetch_events(user_id),
-            "github": github.fetch_activity(user_id),
-            "email": gmail.fetch_email_metadata(user_id),
+            "calendar": self.store.get_events(user_id, "calendar", days),
+            "github": self.store.get_events(user_id, "github", days),
+            # newest first, as gmail.fetch_email_metadata returns them
+            "email": self.store.get_events(user_id, "email", days)[::-1],
         }
@@ -1,21 +1,9 @@
 # memory_ag.py
 
-from autogen import ConversableAgent
-import google.generativeai as genai
-import os
-from dotenv import load_dotenv
+from backend.agents.base_ag import GeminiAgent
 from backend.tools.vector_memory import store_summary, query_memory
 
-# Load your Gemini key
-load_dotenv(".env", override=True)
-API_KEY = os.getenv("GEMINI_API_KEY")
-
-if not API_KEY:
-    raise ValueError("GEMINI_API_KEY not found in environment variables. Please check your .env file.")
-
-genai.configure(api_key=API_KEY)
-
-class MemoryAgent(ConversableAgent):
+class MemoryAgent(GeminiAgent):
     def __init__(self, name="MemoryAgent"):
         super().__init__(
             name=name,
@@ -24,13 +12,8 @@ You are a MemoryAgent. Your job is to:
 1. Take raw user activity logs.
 2. Use Gemini to generate a concise 2-3 sentence summary (mood, energy, time, activity type).
 3. Store that summary (plus raw log) into long-term memory for later retrieval.
-""",
-            llm_config=False,
-            human_input_mode="NEVER",
-            max_consecutive_auto_reply=1
+"""
         )
-        # instantiate the Gemini model
-        self.model = genai.GenerativeModel("gemini-2.5-flash")
 
     def generate_summary(self, raw_input: str) -> str:
         prompt = f"""
@@ -43,8 +26,7 @@ Activity Log:
 Summary:
 """
         try:
-            resp = self.model.generate_content(prompt)
-            return resp.text.strip()
+            return self.generate(prompt).strip()
         except Exception as e:
             return f"[Summary generation failed] {e}"
 
@@ -1,19 +1,9 @@
-from autogen import ConversableAgent
-import os
-from dotenv import load_dotenv
-import google.generativeai as genai
+from backend.agents.base_ag import GeminiAgent
 
-load_dotenv(".env", override=True)
+class TimeAnalyzerAgent(GeminiAgent):
+    default_prompt = "Please analyze the provided time logs."
 
-API_KEY = os.getenv("GEMINI_API_KEY")
-
-class TimeAnalyzerAgent(ConversableAgent):
     def __init__(self, name="TimeAnalyzerAgent"):
-        # Configure Gemini API
-        if not API_KEY:
-            raise ValueError("GEMINI_API_KEY not found in environment variables. Please check your .env file.")
-        genai.configure(api_key=API_KEY)
-        
         super().__init__(
             name=name,
             system_message="""You are a TimeAnalyzerAgent specialized in analyzing time logs and categorizing activities.
@@ -24,40 +14,19 @@ class TimeAnalyzerAgent(ConversableAgent):
             - Context Switching (rapid task changes)
             - Distractions (social media, unplanned interruptions)
             
-            Always provide structured analysis with time durations and semantic tags.""",
-            
-            # AutoGen doesn't natively support Gemini, so we'll use a custom implementation
-            llm_config=False,  # Disable default LLM config
-            human_input_mode="NEVER",  # This agent works automatically
-            max_consecutive_auto_reply=1
+            Always provide structured analysis with time durations and semantic tags."""
         )
-        
-        # Initialize Gemini model
-        self.model = genai.GenerativeModel('gemini-2.5-flash')
-    
-    def generate_reply(self, messages=None, sender=None, config=None):
-        """Override the generate_reply method to use Gemini API"""
-        try:
-            # Get the last message content
-            if messages:
-                last_message = messages[-1]["content"] if isinstance(messages[-1], dict) else str(messages[-1])
-            else:
-                last_message = "Please analyze the provided time logs."
-            
-            # Generate response using Gemini
-            response = self.model.generate_content(last_message)
-            return response.text
-            
-        except Exception as e:
-            return f"Error generating response: {str(e)}"
 
-    def analyze_logs(self, logs: dict) -> dict:
+    def analyze_logs(self, logs: dict, context_switches: str = None, deadline=None) -> dict:
         """Main method to analyze time logs"""
         prompt = f"""
         Analyze the following time log data and categorize each activity:
         
         Log Data: {logs}
         
+        Measured Context Switches: {context_switches or "Not measured - estimate from the log data"}
+        (When measured, use these numbers for context_switching instead of estimating.)
+        
         Please provide a structured analysis in the following format:
         {{
             "categories": {{
@@ -76,10 +45,10 @@ class TimeAnalyzerAgent(ConversableAgent):
         """
         
         try:
-            response = self.model.generate_content(prompt)
+            response = self.generate(prompt, deadline=deadline)
             return {
                 "status": "success",
-                "analysis": response.text,
+                "analysis": response,
                 "raw_logs": logs
             }
         except Exception as e:
@@ -1,21 +1,10 @@
-from autogen import ConversableAgent
-import os
-from dotenv import load_dotenv
-import google.generativeai as genai
+from backend.agents.base_ag import GeminiAgent
 import json
 
-load_dotenv(".env", override=True)
+class UserProxyAgent(GeminiAgent):
+    default_prompt = "Hello! How can I help you with your productivity analysis today?"
 
-API_KEY = os.getenv("GEMINI_API_KEY")
-
-# Configure Gemini API globally
-genai.configure(api_key=API_KEY)
-
-class UserProxyAgent(ConversableAgent):
     def __init__(self, name="UserProxyAgent"):
-        if not API_KEY:
-            raise ValueError("GEMINI_API_KEY not found in environment variables. Please check your .env file.")
-        genai.configure(api_key=API_KEY)
         super().__init__(
             name=name,
             system_message="""You are a UserProxyAgent that interfaces with human users.
@@ -23,31 +12,10 @@ class UserProxyAgent(ConversableAgent):
             - Receive and process user voice or text input
             - Convert user queries into structured formats
             - Handle user interactions professionally and helpfully
-            - Route user requests to appropriate agents""",
-            
-            llm_config=False,  # Disable default LLM config
-            human_input_mode="NEVER",
-            max_consecutive_auto_reply=1
+            - Route user requests to appropriate agents"""
         )
-        
-        # Initialize Gemini model
-        self.model = genai.GenerativeModel('gemini-2.5-flash')
-    
-    def generate_reply(self, messages=None, sender=None, config=None):
-        """Override the generate_reply method to use Gemini API"""
-        try:
-            if messages:
-                last_message = messages[-1]["content"] if isinstance(messages[-1], dict) else str(messages[-1])
-            else:
-                last_message = "Hello! How can I help you with your productivity analysis today?"
-            
-            response = self.model.generate_content(last_message)
-            return response.text
-            
-        except Exception as e:
-            return f"Error generating response: {str(e)}"
 
-    def process_input(self, user_input: str) -> dict:
+    def process_input(self, user_input: str, deadline=None) -> dict:
         """Process user input and structure it"""
         try:
             prompt = f"""
@@ -63,10 +31,10 @@ class UserProxyAgent(ConversableAgent):
             }}
             """
             
-            response = self.model.generate_content(prompt)
+            response = self.generate(prompt, deadline=deadline)
             return {
                 "status": "success",
-                "processed_input": response.text,
+                "processed_input": response,
                 "original_input": user_input
             }
         except Exception as e:
@@ -1,18 +1,35 @@
-from typing import Optional
-from fastapi import FastAPI, UploadFile, Form, HTTPException
+from typing import List, Optional
+from fastapi import Depends, FastAPI, UploadFile, Form, Header, HTTPException, Request, Response, WebSocket, WebSocketDisconnect
+from fastapi.responses import FileResponse
 from fastapi.middleware.cors import CORSMiddleware
 from backend.agents.userproxy_ag import UserProxyAgent
 from backend.agents.voicelog_ag import VoiceLogAgent
-from backend.agents.datafetch_ag import DataFetcherAgent
+from backend.agents.datafetch_ag import DataFetcherAgent, SYNC_MIN_INTERVAL
 from backend.agents.timeanalyze_ag import TimeAnalyzerAgent
 from backend.agents.insight_ag import InsightAgent
 from backend.agents.coach_ag import CoachAgent
 from backend.agents.memory_ag import MemoryAgent
-from backend.tools import github, google_calendar
-from backend.tools.vector_memory import memory_store
-from backend.tools.whisper_transcriber import transcribe_and_tag, extract_activity_insights
+from backend.tools import vector_memory
+from backend.tools.vector_memory import VectorMemoryStore, init_memory_store
+from backend.tools.memory_snapshot import MemorySnapshotter
+from backend.tools.team_analytics import team_report
+from backend.tools.event_store import event_store
+from backend.tools.event_archive import event_archive
+from backend.tools.rollups import rollups, EMAIL_MINUTES
+from backend.tools.context_switch import detect_switches, format_for_prompt
+from backend.tools import intervals
+from backend.tools.llm_client import llm_client
+from backend.tools.precompute import PrecomputeScheduler
+from backend.tools.versions import versions, diff_view, if_none_match
+from backend.tools.profiling import ProfilingMiddleware, profiler
+from backend.tools.deadline import Deadline, DeadlineExceeded, deadline_stats, count as count_deadline
+from backend.tools.whisper_transcriber import transcribe_and_tag, extract_activity_insights, transcribe_batch
+from backend.tools.whisper_transcriber import MODEL_SIZE, COMPUTE_TYPE, BEAM_SIZE
+from backend.tools.transcription_cache import transcription_cache, CHUNK_SIZE
+import asyncio
 import os
 import tempfile
+from datetime import date, datetime, timedelta
 
 app = FastAPI(title="TimeCop API", description="Multi-Agent Productivity System")
 
@@ -23,7 +40,10 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],  # Allow all methods
     allow_headers=["*"],  # Allow all headers
+    expose_headers=["ETag", "X-Profile-Id"],
 )
+# Opt-in per-request profiling (X-Profile header or PROFILE_SAMPLE_RATE)
+app.add_middleware(ProfilingMiddleware, profiler=profiler)
 
 # Initialize agents
 user_proxy = UserProxyAgent()
@@ -33,49 +53,141 @@ analyzer = TimeAnalyzerAgent()
 insight = InsightAgent()
 coach = CoachAgent()
 memory = MemoryAgent()
+# Replaced by the sharded store at startup when MEMORY_SHARDS > 0
+memory_store = vector_memory.memory_store
+precompute = PrecomputeScheduler(fetcher, analyzer, insight, memory_store)
+# Set at startup; shard workers restore and snapshot their own stores
+snapshotter = None
+
+def voice_logs_for(user_id: str) -> List[dict]:
+    return [d for d in memory_store.get_documents(user_id) if d["type"] == "voice_log"]
+
+@app.on_event("startup")
+async def start_background_jobs():
+    global memory_store, snapshotter
+    # Sharding starts here rather than at import so it also happens in the
+    # serving process under uvicorn --reload and --workers
+    memory_store = precompute.memory_store = await asyncio.to_thread(init_memory_store)
+    if isinstance(memory_store, VectorMemoryStore):
+        snapshotter = MemorySnapshotter(memory_store)
+        print("Memory restored:", await asyncio.to_thread(memory_store.restore))
+        snapshotter.start()
+    # Rollups are in-memory: rebuild them from the archive before serving
+    user_ids = await asyncio.to_thread(memory_store.user_ids)
+    rebuilt = await asyncio.to_thread(rollups.rebuild, user_ids, voice_logs_for)
+    # Dashboards cached against the pre-rebuild counters must not 304
+    for user_id, events in rebuilt.items():
+        versions.bump(user_id, "events", {"backfill": events})
+    print(f"Rollups rebuilt for {len(rebuilt)} users ({sum(rebuilt.values())} events)")
+    precompute.start()
+
+@app.on_event("shutdown")
+async def stop_background_jobs():
+    precompute.stop()
+    if snapshotter is not None:
+        snapshotter.stop()
+    else:
+        memory_store.close()
 
 @app.post("/analyze")
-async def analyze_productivity(user_input: str = Form(...), user_id: str = Form(...)):
-    """Main productivity analysis endpoint"""
+async def analyze_productivity(request: Request, user_input: str = Form(...), user_id: str = Form(...)):
+    """Main productivity analysis endpoint.
+
+    Runs under a per-request deadline (X-Request-Timeout header, seconds).
+    When the budget runs out the remaining stages are skipped and whatever
+    is ready (e.g. insights without coaching) is returned as "partial".
+    """
+    deadline = Deadline.from_request(request)
+    processed_input = analyzed = insights = coaching = precomputed = None
+    historical_context = ""
+    stages = ["process_input", "fetch_logs", "analyze", "insights", "store_memory", "coach"]
+    done = []
     try:
         # Process user input
         print("user_input:", user_input)
         print("user_id:", user_id)
-        processed_input = user_proxy.process_input(user_input)
-        print("processed_input:", processed_input)
-        all_logs = fetcher.fetch_all_logs(user_id)
-        github_data = all_logs["github"]
-        calendar_data = all_logs["calendar"]
-        email_data = all_logs["email"]
-        print("github_data:", github_data)
-        # Combine all logs
-        combined_logs = {
-            "github": github_data,
-            "calendar": calendar_data,
-            "email": email_data,
-            "user_query": processed_input
-        }
-        
-        # Analyze the logs
-        analyzed = analyzer.analyze_logs(combined_logs)
-        
-        # Generate insights
-        insights = insight.generate_insights(analyzed)
-        
-        # Store in RAG memory
-        memory_store.store_summary(user_id, insights, "analysis")
-        
+        precompute.touch(user_id)
+        all_logs = await deadline.run(fetcher.fetch_all_logs, user_id)
+        done.append("fetch_logs")
+        # Reuse the off-peak result when the user's data hasn't changed since;
+        # only the query-specific coaching then runs live
+        precomputed = precompute.get_fresh(user_id)
+        if precomputed:
+            processed_input = {"status": "skipped", "original_input": user_input}
+            analyzed = precomputed["analysis"]
+            insights = precomputed["insights"]
+            schedule = precomputed["schedule"]
+            done += ["process_input", "analyze", "insights", "store_memory"]
+        else:
+            processed_input = await deadline.run(user_proxy.process_input, user_input, deadline=deadline)
+            done.append("process_input")
+            print("processed_input:", processed_input)
+            github_data = all_logs["github"]
+            calendar_data = all_logs["calendar"]
+            email_data = all_logs["email"]
+            print("github_data:", github_data)
+            # Combine all logs
+            combined_logs = {
+                "github": github_data,
+                "calendar": calendar_data,
+                "email": email_data,
+                "user_query": processed_input
+            }
+
+            # Measure context switches (email comes newest first)
+            switches = detect_switches(github_data, calendar_data, email_data[::-1])
+
+            # Analyze the logs
+            analyzed = await deadline.run(
+                analyzer.analyze_logs, combined_logs, format_for_prompt(switches), deadline=deadline
+            )
+            deadline.check()
+            done.append("analyze")
+
+            # Generate insights
+            insights = await deadline.run(insight.generate_insights, analyzed, deadline=deadline)
+            deadline.check()
+            done.append("insights")
+
+            # Store in RAG memory (off the event loop: a shard call blocks on its pipe)
+            await asyncio.to_thread(memory_store.store_summary, user_id, insights, "analysis")
+            done.append("store_memory")
+            schedule = intervals.format_for_prompt(intervals.CalendarIntervals(calendar_data).summary())
+
         # Get coaching advice with historical context
-        historical_context = memory_store.query_memory(user_id, user_input)
-        coaching = coach.coach(insights.get("analysis", ""), historical_context)
+        historical_context = await deadline.run(memory_store.query_memory, user_id, user_input)
+        coaching = await deadline.run(
+            coach.coach, insights.get("analysis", ""), historical_context, schedule, deadline=deadline
+        )
+        deadline.check()
+        done.append("coach")
         
+        count_deadline("completed")
         return {
             "status": "success",
             "user_input": processed_input,
             "analysis": analyzed,
             "insights": insights,
             "coaching": coaching,
-            "historical_context_used": len(historical_context.split('\n'))
+            "historical_context_used": len(historical_context.split('\n')),
+            "precomputed": bool(precomputed)
+        }
+
+    except DeadlineExceeded as e:
+        # Degrade: return the stages that finished, drop the rest
+        skipped = [s for s in stages if s not in done]
+        count_deadline("cancelled_stages", len(skipped))
+        count_deadline("partial_responses")
+        return {
+            "status": "partial",
+            "reason": e.reason,
+            "completed_stages": done,
+            "skipped_stages": skipped,
+            "user_input": processed_input,
+            "analysis": analyzed if "analyze" in done else None,
+            "insights": insights if "insights" in done else None,
+            "coaching": None,
+            "historical_context_used": len(historical_context.split('\n')) if historical_context else 0
         }
         
     except Exception as e:
@@ -84,18 +196,36 @@ async def analyze_productivity(user_input: str = Form(...), user_id: str = Form(
 @app.post("/voice-log")
 async def process_voice_log(file: UploadFile, user_id: str = Form(...)):
     """Process voice input and return transcription, tags, insights"""
-    # 1. Save the upload
+    precompute.touch(user_id)
+    # 1. Save the upload, hashing it as it streams in
+    hasher = transcription_cache.new_hasher(
+        model=MODEL_SIZE, compute_type=COMPUTE_TYPE, beam_size=BEAM_SIZE
+    )
     with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as tmp:
-        tmp.write(await file.read())
+        while chunk := await file.read(CHUNK_SIZE):
+            hasher.update(chunk)
+            tmp.write(chunk)
         temp_path = tmp.name
+    cache_key = hasher.hexdigest()
 
     try:
-        # 2. Raw transcription + tagging
-        raw = transcribe_and_tag(temp_path)
-        # 3. Extract deeper insights
-        enriched = extract_activity_insights(raw)
-        # 4. Store in memory
-        memory_store.store_summary(user_id, enriched, "voice_log")
+        entry = transcription_cache.get(cache_key)
+        cached = entry is not None
+        if cached:
+            enriched = entry["result"]
+        else:
+            # 2. Raw transcription + tagging
+            raw = transcribe_and_tag(temp_path)
+            # 3. Extract deeper insights
+            enriched = extract_activity_insights(raw)
+            entry = {"result": enriched, "stored_for": []}
+        # 4. Store in memory - a retried upload of the same audio is only
+        #    written once per user
+        if user_id not in entry["stored_for"]:
+            await asyncio.to_thread(memory_store.store_summary, user_id, enriched, "voice_log")
+            rollups.ingest_voice_log(user_id, enriched)
+            entry["stored_for"].append(user_id)
+            transcription_cache.put(cache_key, entry)
 
         # 5. Return a flat schema for React to consume
         return {
@@ -108,7 +238,8 @@ async def process_voice_log(file: UploadFile, user_id: str = Form(...)):
                 "confidence":     enriched["confidence"],
             },
             "insight_summary": enriched["insight_summary"],
-            "stored_in_memory": True
+            "stored_in_memory": True,
+            "cached": cached
         }
 
     except Exception as e:
@@ -116,33 +247,88 @@ async def process_voice_log(file: UploadFile, user_id: str = Form(...)):
         import traceback; traceback.print_exc()
         # Return the exception message in the response
         raise HTTPException(status_code=500, detail=f"Voice processing failed: {e}")
+    finally:
+        os.remove(temp_path)
+
+@app.post("/voice-log/batch")
+async def process_voice_log_batch(files: List[UploadFile], user_id: str = Form(...)):
+    """Process many voice logs in one batched transcription + tagging pass"""
+    # 1. Save every upload
+    temp_paths = []
+    try:
+        for f in files:
+            with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as tmp:
+                tmp.write(await f.read())
+                temp_paths.append(tmp.name)
+
+        # 2. Batched transcription, one tagging call
+        batch = transcribe_batch(temp_paths)
+        # Keep the client's file names rather than the temp ones
+        for f, r in zip(files, batch["results"]):
+            r["audio_file"] = f.filename
+        # 3. Store everything that decoded in memory with one write
+        summaries = [{k: v for k, v in r.items() if k != "performance"}
+                     for r in batch["results"] if "error" not in r]
+        if summaries:
+            await asyncio.to_thread(memory_store.store_summaries, user_id, summaries, "voice_log")
+        for summary in summaries:
+            rollups.ingest_voice_log(user_id, summary)
+
+        # 4. Same flat schema as /voice-log, one entry per file
+        items = []
+        for r in batch["results"]:
+            if "error" in r:
+                items.append({k: r[k] for k in ("audio_file", "status", "error", "performance")})
+                continue
+            items.append({
+                "audio_file": r["audio_file"],
+                "transcription": r["transcription"],
+                "tags": {
+                    "mood":           r["mood"],
+                    "duration":       r["duration"],
+                    "activity_type":  r["activity_type"],
+                    "energy_level":   r["energy_level"],
+                    "confidence":     r["confidence"],
+                },
+                "insight_summary": r["insight_summary"],
+                "performance": r["performance"],
+            })
+        return {
+            "items": items,
+            "performance": batch["performance"],
+            "stored_in_memory": True
+        }
+
+    except Exception as e:
+        import traceback; traceback.print_exc()
+        raise HTTPException(status_code=500, detail=f"Batch voice processing failed: {e}")
+    finally:
+        for path in temp_paths:
+            os.remove(path)
 
 @app.get("/memory/{user_id}")
 async def get_user_memory(
     user_id: str,
+    request: Request,
+    response: Response,
     query: Optional[str] = None,
     limit: int = 5
 ):
+    # Unchanged memory answers 304 before any retrieval runs
+    etag = versions.etag(user_id, "memory", query=query, limit=limit)
+    if if_none_match(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=cache_headers(etag))
     try:
-        # 1. The flat, line-based output
-        memory_text = memory_store.query_memory(user_id, query=query, limit=limit)
-
-        # 2. Trend data
-        trends = memory_store.get_trends(user_id)
-
-        # 3. Build the items list from the in‑memory store
-        raw_docs = memory_store.memory_store.get(user_id, [])
-        recent = raw_docs[-limit:]
-        items = []
-        for doc in recent:
-            content = doc["content"]
-            items.append({
-                "timestamp": doc["timestamp"],
-                "type": doc["type"],
-                "llm_summary": content.get("llm_summary"),
-                "raw_input": content.get("raw_input"),
-            })
+        # The flat, line-based output, trend data and the recent documents;
+        # run concurrently off the event loop
+        memory_text, trends, recent = await asyncio.gather(
+            asyncio.to_thread(memory_store.query_memory, user_id, query=query, limit=limit),
+            asyncio.to_thread(memory_store.get_trends, user_id),
+            asyncio.to_thread(memory_store.get_documents, user_id, limit=limit),
+        )
+        items = [VectorMemoryStore.view_item(doc) for doc in recent]
 
+        response.headers.update(cache_headers(etag))
         return {
             "status": "success",
             "memory_text": memory_text,
@@ -153,54 +339,259 @@ async def get_user_memory(
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Memory query failed: {e}")
-        
+
+@app.post("/memory/shards/resize")
+async def resize_memory_shards(shards: int):
+    """Rebalance users across a new number of memory shard processes"""
+    if not hasattr(memory_store, "resize"):
+        raise HTTPException(400, "Memory sharding is disabled (set MEMORY_SHARDS > 0)")
+    if shards < 1:
+        raise HTTPException(400, "shards must be at least 1")
+    return {"status": "success", **await asyncio.to_thread(memory_store.resize, shards)}
+
+@app.post("/memory/snapshot")
+async def snapshot_memory():
+    """Write a memory snapshot now, e.g. right before a deploy"""
+    try:
+        target = snapshotter if snapshotter is not None else memory_store
+        result = await asyncio.to_thread(target.snapshot)
+        return {"status": "success", **result}
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Memory query failed: {str(e)}")
+        raise HTTPException(500, f"Memory snapshot failed: {e}")
 
-@app.get("/dashboard/{user_id}")
-async def get_dashboard_analytics(user_id: str):
+@app.get("/memory/snapshot/stats")
+async def get_snapshot_stats():
+    """Background snapshot counters and the last snapshot's size and duration"""
+    if snapshotter is not None:
+        stats = snapshotter.get_stats()
+    else:
+        stats = await asyncio.to_thread(memory_store.snapshot_stats)
+    return {"status": "success", "stats": stats}
+
+@app.post("/team/analytics")
+async def get_team_analytics(
+    user_ids: List[str] = Form(...),
+    queries: List[str] = Form([]),
+    days: int = Form(7),
+    summary_type: Optional[str] = Form(None),
+    top_n: int = Form(10)
+):
+    """Team themes, users matching each query (e.g. burnout notes), user
+    clusters and voice-log tag counts, from one stacked sparse matrix"""
+    try:
+        report = await asyncio.to_thread(
+            team_report, memory_store, user_ids, queries, days, summary_type, top_n
+        )
+        return {"status": "success", **report}
+    except Exception as e:
+        raise HTTPException(500, f"Team analytics failed: {e}")
+
+def build_dashboard(user_id: str) -> dict:
     """
-    Returns three analytics series for the frontend dashboard:
+    Three analytics series for the frontend dashboard:
       1. time_distribution: hours per category
       2. focus_trend: last 7 days of deep work hours
       3. context_switches: last 7 days of task switches
     """
-    try:
-        # 1. Fetch real data
-        gh_logs = github.fetch_activity(user_id)
-        cal_events = google_calendar.fetch_events(user_id)
-
-        # 2. Build distribution (example logic)
-        time_distribution = {
-            "Deep Work": sum(1 for e in gh_logs if e.get("action") == "commit"),
-            "Meetings": len(cal_events),
-            "Distraction": 2,           # replace with real NLP categorization
-            "Communication": 3,         # ditto
-            "Context Switching": 4      # ditto
-        }
+    # 1. Pull new events (this also updates the rollups, switches included),
+    #    then read 7 days of precomputed per-day counters and the calendar window
+    all_logs = fetcher.fetch_all_logs(user_id)
+    week = rollups.get_range(user_id, days=7)
+    focus_by_day = {
+        d["date"]: d for d in intervals.CalendarIntervals(all_logs["calendar"]).summary()
+    }
+    total = lambda key: sum(d.get(key, 0) for d in week)
 
-        # 3. Build focus trend (mocked, adapt to real timestamps)
-        focus_trend = [
-            {"date": f"2025-07-{20+i}", "deep_work_hours": 1.5 + (i % 3)}
-            for i in range(7)
-        ]
+    # 2. Build distribution (Deep Work = focus time not eaten by meetings)
+    email_minutes = (total("emails_sent") * EMAIL_MINUTES["sent"]
+                     + total("emails_received") * EMAIL_MINUTES["received"])
+    time_distribution = {
+        "Deep Work": round(sum(d["net_deep_work_hours"] for d in focus_by_day.values()), 1),
+        "Meetings": round(total("meeting_minutes") / 60, 1),
+        "Distraction": total("activity_distraction"),   # voice logs tagged as distraction
+        "Communication": round(email_minutes / 60, 1),
+        "Context Switching": total("switches")
+    }
 
-        # 4. Build context switches per day (mocked)
-        context_switches = [
-            {"date": f"2025-07-{20+i}", "switches": 8 + (i * 2 % 5)}
-            for i in range(7)
-        ]
+    # 3. Focus trend
+    focus_trend = []
+    for d in week:
+        day = focus_by_day.get(d["date"], {})
+        focus_trend.append({
+            "date": d["date"],
+            "deep_work_hours": day.get("net_deep_work_hours", 0),
+            "scheduled_focus_hours": round(d.get("focus_minutes", 0) / 60, 1),
+            "longest_block_minutes": day.get("longest_block_minutes", 0),
+            "fragmentation": day.get("fragmentation"),
+            "free_slots": day.get("free_slots", []),
+        })
 
-        return {
-            "status": "success",
-            "time_distribution": time_distribution,
-            "focus_trend": focus_trend,
-            "context_switches": context_switches
-        }
+    # 4. Context switches per day
+    context_switches = [
+        {"date": d["date"], "switches": d.get("switches", 0)}
+        for d in week
+    ]
+
+    return {
+        "time_distribution": time_distribution,
+        "focus_trend": focus_trend,
+        "context_switches": context_switches,
+        "top_switch_triggers": rollups.top_switch_triggers(user_id, days=7)
+    }
+
+def cache_headers(etag: str) -> dict:
+    # no-cache: browsers keep the body but revalidate it with If-None-Match
+    return {"ETag": etag, "Cache-Control": "no-cache"}
+
+@app.get("/dashboard/{user_id}")
+async def get_dashboard_analytics(user_id: str, request: Request, response: Response):
+    """Dashboard series; answers 304 when neither events nor memory changed"""
+    precompute.touch(user_id)
+    try:
+        # Sync first: the ETag must reflect any upstream events that just arrived
+        fetcher.sync(user_id)
+        etag = versions.etag(user_id, "memory", "events", day=date.today().isoformat())
+        if if_none_match(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=cache_headers(etag))
+        dashboard = build_dashboard(user_id)
+        response.headers.update(cache_headers(etag))
+        return {"status": "success", **dashboard}
 
     except Exception as e:
         raise HTTPException(500, f"Dashboard fetch failed: {e}")
+
+@app.websocket("/ws/{user_id}")
+async def live_updates(websocket: WebSocket, user_id: str, snapshot: bool = True,
+                       dashboard: bool = True, memory: bool = True):
+    """Optional push channel for an open dashboard or memory view.
+
+    Sends the full dashboard once (unless snapshot=false), then only
+    increments: "memory_items" for newly stored memories such as voice logs,
+    and "dashboard_patch" with just the series points that changed.
+    dashboard=false subscribes to memory items only and never syncs
+    upstream; memory=false leaves the memory items out.
+    """
+    await websocket.accept()
+    queue = versions.subscribe(user_id)
+
+    async def wait_closed():
+        # Clients send nothing; reading is how a closed tab is noticed
+        while (await websocket.receive())["type"] != "websocket.disconnect":
+            pass
+
+    closed = asyncio.ensure_future(wait_closed())
+    try:
+        current = await asyncio.to_thread(build_dashboard, user_id) if dashboard else None
+        if snapshot and dashboard:
+            await websocket.send_json({"type": "snapshot", "version": versions.get(user_id), **current})
+        while True:
+            getter = asyncio.ensure_future(queue.get())
+            done, _ = await asyncio.wait(
+                {getter, closed}, timeout=SYNC_MIN_INTERVAL if dashboard else None,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            if getter not in done:
+                getter.cancel()
+                if closed in done:
+                    break
+                # Quiet period: poll upstream; new events arrive as bumps
+                await asyncio.to_thread(fetcher.sync, user_id)
+                continue
+            # Coalesce a burst of bumps into one recompute
+            messages = [getter.result()]
+            while not queue.empty():
+                messages.append(queue.get_nowait())
+            items = [i for m in messages if m["kind"] == "memory" and m["item"] for i in m["item"]["items"]]
+            if items and memory:
+                await websocket.send_json({"type": "memory_items", "items": items})
+            if not dashboard:
+                continue
+            latest = await asyncio.to_thread(build_dashboard, user_id)
+            patch = diff_view(current, latest)
+            if patch:
+                await websocket.send_json({"type": "dashboard_patch", "version": versions.get(user_id), **patch})
+            current = latest
+    except WebSocketDisconnect:
+        pass
+    finally:
+        closed.cancel()
+        versions.unsubscribe(user_id, queue)
     
+@app.get("/trends/{user_id}")
+async def get_long_trends(user_id: str, days: int = 180):
+    """Daily series over a long horizon, scanned from the columnar archive"""
+    try:
+        end = datetime.now() + timedelta(days=1)
+        start = end - timedelta(days=days)
+        series = event_archive.daily_counts(user_id, start.date(), end.date())
+        return {"status": "success", **series}
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    except Exception as e:
+        raise HTTPException(500, f"Trend scan failed: {e}")
+
+@app.post("/rollups/{user_id}/backfill")
+async def backfill_rollups(user_id: str, days: int = 365):
+    """Rebuild a user's daily rollups from the event archive and voice logs"""
+    try:
+        voice_logs = await asyncio.to_thread(voice_logs_for, user_id)
+        events = await asyncio.to_thread(rollups.backfill, user_id, days=days, voice_logs=voice_logs)
+        versions.bump(user_id, "events", {"backfill": events})
+        return {"status": "success", "events": events, "voice_logs": len(voice_logs)}
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    except Exception as e:
+        raise HTTPException(500, f"Rollup backfill failed: {e}")
+
+@app.get("/llm/stats")
+async def get_llm_stats():
+    """Shared LLM client counters, including how often hedging fired and won"""
+    return {"status": "success", "stats": llm_client.get_stats()}
+
+@app.get("/requests/stats")
+async def get_request_stats():
+    """Deadline and cancellation counters for /analyze"""
+    return {"status": "success", "stats": deadline_stats}
+
+@app.get("/precompute/stats")
+async def get_precompute_stats():
+    """Off-peak precomputation counters and today's LLM budget use"""
+    return {"status": "success", "stats": precompute.get_stats()}
+
+@app.post("/precompute/run")
+async def run_precompute():
+    """Precompute every due user now, ignoring the off-peak window"""
+    return {"status": "success", "users_computed": await precompute.run_once()}
+
+def require_profile_token(x_profile_token: Optional[str] = Header(None)):
+    """Profiles expose stacks and allocations: only PROFILE_TOKEN holders read them"""
+    if not profiler.token:
+        raise HTTPException(403, "Profile access is disabled (set PROFILE_TOKEN)")
+    if not profiler.authorized(x_profile_token):
+        raise HTTPException(401, "Missing or invalid X-Profile-Token")
+
+@app.get("/profiles", dependencies=[Depends(require_profile_token)])
+async def list_profiles():
+    """Stored request profiles, newest first"""
+    return {"status": "success", "profiles": profiler.list(), "stats": profiler.stats}
+
+@app.get("/profiles/{request_id}", dependencies=[Depends(require_profile_token)])
+async def get_profile(request_id: str, format: str = "json"):
+    """One request's profile: json (top frames and allocations), svg
+    (flamegraph) or folded (stacks for flamegraph.pl / speedscope)"""
+    media_types = {"json": "application/json", "svg": "image/svg+xml", "folded": "text/plain"}
+    if format not in media_types:
+        raise HTTPException(400, f"format must be one of {', '.join(media_types)}")
+    path = profiler.path(request_id, format)
+    if path is None:
+        raise HTTPException(404, f"No profile for request {request_id}")
+    return FileResponse(path, media_type=media_types[format])
+
+@app.get("/sync/stats")
+async def get_sync_stats():
+    """Upstream fetch counters for the incremental sync layer"""
+    return {"status": "success", "stats": event_store.stats}
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
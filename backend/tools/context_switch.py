@@ -0,0 +1,82 @@
+# context_switch.py
+
+import heapq
+from collections import Counter
+from datetime import datetime
+from typing import Dict, Iterable, List
+
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Consecutive events further apart than this are a fresh start, not a switch
+DEFAULT_MAX_GAP_MINUTES = 90
+# Events closer than this are treated as one burst (e.g. a commit logged
+# during a meeting reminder) and not counted as a switch
+DEFAULT_MIN_GAP_MINUTES = 2
+
+
+def activity_key(source: str, event: Dict) -> str:
+    """What counts as 'the same activity' when detecting a switch."""
+    if source == "github":
+        return f"github:{event['repo']}"
+    if source == "calendar":
+        return event["event_type"]
+    return source
+
+
+def is_switch(prev_time: datetime, prev_key: str, when: datetime, key: str,
+              max_gap_minutes: float = DEFAULT_MAX_GAP_MINUTES,
+              min_gap_minutes: float = DEFAULT_MIN_GAP_MINUTES) -> bool:
+    """Whether two consecutive events count as a context switch: a change of
+    activity_key on the same day, with a gap within [min_gap, max_gap]."""
+    if key == prev_key or when.date() != prev_time.date():
+        return False
+    return min_gap_minutes <= (when - prev_time).total_seconds() / 60 <= max_gap_minutes
+
+
+def _stream(source: str, events: Iterable[Dict]):
+    field = "start" if source == "calendar" else "timestamp"
+    for event in events:
+        yield event[field], source, event
+
+
+def detect_switches(github: List[Dict], calendar: List[Dict], email: List[Dict],
+                    max_gap_minutes: float = DEFAULT_MAX_GAP_MINUTES,
+                    min_gap_minutes: float = DEFAULT_MIN_GAP_MINUTES,
+                    top_n: int = 5) -> Dict:
+    """Count context switches across the merged activity streams.
+
+    Each list must already be sorted oldest first (as the fetchers and the
+    event store return them). The streams are k-way merged with a heap in
+    O(n log k) and swept once, counting consecutive pairs that pass
+    is_switch. DailyRollups applies the same rule incrementally.
+    """
+    merged = heapq.merge(
+        _stream("github", github), _stream("calendar", calendar), _stream("email", email),
+        key=lambda item: item[0],
+    )
+    per_day = Counter()
+    triggers = Counter()
+    prev_time = prev_key = None
+    for timestamp, source, event in merged:
+        key = activity_key(source, event)
+        when = datetime.strptime(timestamp, TIME_FORMAT)
+        if prev_key is not None and is_switch(prev_time, prev_key, when, key,
+                                              max_gap_minutes, min_gap_minutes):
+            per_day[timestamp[:10]] += 1
+            triggers[(prev_key, key)] += 1
+        prev_time, prev_key = when, key
+
+    return {
+        "per_day": [{"date": d, "switches": per_day[d]} for d in sorted(per_day)],
+        "total": sum(per_day.values()),
+        "top_triggers": [
+            {"from": a, "to": b, "count": n} for (a, b), n in triggers.most_common(top_n)
+        ],
+    }
+
+
+def format_for_prompt(result: Dict) -> str:
+    """Compact text version of detect_switches output for LLM prompts."""
+    days = ", ".join(f"{d['date']}: {d['switches']}" for d in result["per_day"]) or "none"
+    top = "; ".join(f"{t['from']} -> {t['to']} ({t['count']}x)" for t in result["top_triggers"]) or "none"
+    return f"Total switches: {result['total']}. Per day: {days}. Top triggers: {top}."
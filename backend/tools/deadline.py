@@ -0,0 +1,96 @@
+# deadline.py
+
+import asyncio
+import os
+import threading
+import time
+from typing import Optional
+
+# Per-request budget in seconds when the client sends no X-Request-Timeout
+DEFAULT_REQUEST_BUDGET = float(os.getenv("REQUEST_BUDGET", 120))
+MAX_REQUEST_BUDGET = float(os.getenv("MAX_REQUEST_BUDGET", 300))
+DEADLINE_HEADER = "x-request-timeout"
+# How often a running stage checks for a client disconnect
+DISCONNECT_POLL_SECONDS = 0.5
+
+deadline_stats = {
+    "requests": 0,
+    "completed": 0,
+    "partial_responses": 0,
+    "deadline_exceeded": 0,
+    "client_disconnects": 0,
+    "cancelled_stages": 0,
+}
+_stats_lock = threading.Lock()
+
+
+def count(key: str, n: int = 1):
+    with _stats_lock:
+        deadline_stats[key] += n
+
+
+class DeadlineExceeded(Exception):
+    """Raised when a request's budget runs out or its client goes away."""
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class Deadline:
+    """Time budget for one request, passed down through every agent call."""
+
+    def __init__(self, budget: float = DEFAULT_REQUEST_BUDGET, request=None):
+        self.budget = min(budget, MAX_REQUEST_BUDGET)
+        self.expires_at = time.monotonic() + self.budget
+        self.request = request
+        self.cancel_reason: Optional[str] = None
+        count("requests")
+
+    @classmethod
+    def from_request(cls, request) -> "Deadline":
+        """Budget from the X-Request-Timeout header (seconds), else the default."""
+        try:
+            budget = float(request.headers.get(DEADLINE_HEADER, DEFAULT_REQUEST_BUDGET))
+        except ValueError:
+            budget = DEFAULT_REQUEST_BUDGET
+        return cls(budget if budget > 0 else DEFAULT_REQUEST_BUDGET, request)
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return self.cancel_reason is not None or self.remaining() <= 0
+
+    def check(self):
+        if self.cancel_reason:
+            raise DeadlineExceeded(self.cancel_reason)
+        if self.remaining() <= 0:
+            self._cancel("deadline_exceeded")
+            raise DeadlineExceeded("deadline_exceeded")
+
+    def _cancel(self, reason: str):
+        if self.cancel_reason is None:
+            self.cancel_reason = reason
+            count({"deadline_exceeded": "deadline_exceeded", "client_disconnect": "client_disconnects"}[reason])
+
+    async def run(self, fn, *args, **kwargs):
+        """Run a blocking stage in a worker thread, abandoning it when the
+        deadline passes or the client disconnects.
+
+        The worker thread itself cannot be killed; LLM calls inside it are
+        given the remaining budget as their timeout so they stop on their own.
+        """
+        self.check()
+        task = asyncio.ensure_future(asyncio.to_thread(fn, *args, **kwargs))
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=min(DISCONNECT_POLL_SECONDS, self.remaining()))
+            if done:
+                return task.result()
+            if self.remaining() <= 0:
+                self._cancel("deadline_exceeded")
+            elif self.request is not None and await self.request.is_disconnected():
+                self._cancel("client_disconnect")
+            if self.cancel_reason:
+                raise DeadlineExceeded(self.cancel_reason)
@@ -0,0 +1,77 @@
+# embeddings.py
+
+import logging
+import os
+from typing import List, Optional
+
+import numpy as np
+
+# Directory holding an exported sentence-embedding model (e.g. all-MiniLM-L6-v2)
+# as model.onnx + tokenizer.json. Retrieval falls back to keyword-only without it.
+EMBEDDING_MODEL_DIR = os.getenv("EMBEDDING_MODEL_DIR", os.path.join("models", "all-MiniLM-L6-v2"))
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", 32))
+MAX_TOKENS = 256
+
+
+class OnnxEmbedder:
+    """Small local sentence embedder on onnxruntime, loaded lazily.
+
+    Produces mean-pooled, L2-normalised vectors so a dot product is the
+    cosine similarity.
+    """
+
+    def __init__(self, model_dir: str = EMBEDDING_MODEL_DIR):
+        self.model_dir = model_dir
+        self._session = None
+        self._tokenizer = None
+        self._input_names = ()
+        self._failed = False
+
+    def _load(self) -> bool:
+        if self._session is not None:
+            return True
+        if self._failed:
+            return False
+        try:
+            import onnxruntime as ort
+            from tokenizers import Tokenizer
+
+            tokenizer = Tokenizer.from_file(os.path.join(self.model_dir, "tokenizer.json"))
+            tokenizer.enable_truncation(MAX_TOKENS)
+            tokenizer.enable_padding()
+            self._session = ort.InferenceSession(
+                os.path.join(self.model_dir, "model.onnx"), providers=["CPUExecutionProvider"]
+            )
+            self._tokenizer = tokenizer
+            self._input_names = {i.name for i in self._session.get_inputs()}
+            return True
+        except Exception as e:
+            logging.warning("Embedding model unavailable, using keyword-only retrieval: %s", e)
+            self._failed = True
+            return False
+
+    @property
+    def available(self) -> bool:
+        return self._load()
+
+    def embed(self, texts: List[str], batch_size: int = EMBEDDING_BATCH_SIZE) -> Optional[np.ndarray]:
+        """Embed texts in batches; None when the model is unavailable."""
+        if not texts or not self._load():
+            return None
+        out = []
+        for i in range(0, len(texts), batch_size):
+            encoded = self._tokenizer.encode_batch(texts[i:i + batch_size])
+            ids = np.array([e.ids for e in encoded], dtype=np.int64)
+            mask = np.array([e.attention_mask for e in encoded], dtype=np.int64)
+            feeds = {"input_ids": ids, "attention_mask": mask}
+            if "token_type_ids" in self._input_names:
+                feeds["token_type_ids"] = np.zeros_like(ids)
+            hidden = self._session.run(None, feeds)[0]
+            weights = mask[..., None].astype(np.float32)
+            pooled = (hidden * weights).sum(axis=1) / np.clip(weights.sum(axis=1), 1e-9, None)
+            out.append(pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-9, None))
+        return np.vstack(out).astype(np.float32)
+
+
+# global instance
+embedder = OnnxEmbedder()
@@ -0,0 +1,298 @@
+# event_archive.py
+
+import json
+import os
+import re
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from backend.tools.event_store import event_id
+
+ARCHIVE_DIR = os.getenv("EVENT_ARCHIVE_DIR", os.path.join(".cache", "event_archive"))
+
+SOURCE_CODES = {"github": 0, "calendar": 1, "email": 2}
+
+# User ids become directory names; anything else (separators, "..") is rejected
+USER_ID_PATTERN = re.compile(r"[A-Za-z0-9][A-Za-z0-9@._+-]{0,127}")
+
+# Fixed-width numeric columns
+NUMERIC_COLUMNS = {
+    "ts": np.int64,               # event time, epoch seconds (calendar: start)
+    "end_ts": np.int64,           # calendar end; equals ts for point events
+    "source": np.uint8,           # SOURCE_CODES
+    "duration_minutes": np.int32,
+    "lines_changed": np.int32,    # 0 when not a commit
+    "is_sent": np.int8,
+}
+# Dictionary-encoded string columns; code 0 is always "" (missing)
+DICT_COLUMNS = ("action", "repo", "category", "priority", "summary")
+COLUMNS = tuple(NUMERIC_COLUMNS) + DICT_COLUMNS
+
+
+def check_user_id(user_id: str) -> str:
+    """Return user_id if it is safe to use as a directory name, else raise ValueError."""
+    if not isinstance(user_id, str) or not USER_ID_PATTERN.fullmatch(user_id):
+        raise ValueError(f"Invalid user id: {user_id!r}")
+    return user_id
+
+
+def _epoch(values: List[str]) -> np.ndarray:
+    """"%Y-%m-%d %H:%M:%S" strings -> epoch seconds, vectorized."""
+    return np.array(values, dtype="datetime64[s]").astype(np.int64)
+
+
+def _rows(source: str, events: List[Dict]) -> Dict[str, list]:
+    """Project fetcher records onto the archive columns."""
+    if source == "github":
+        return {
+            "ts": _epoch([e["timestamp"] for e in events]),
+            "action": [e["action"] for e in events],
+            "repo": [e["repo"] for e in events],
+            "summary": [e.get("commit_message") or "" for e in events],
+            "lines_changed": [e.get("lines_changed") or 0 for e in events],
+        }
+    if source == "calendar":
+        return {
+            "ts": _epoch([e["start"] for e in events]),
+            "end_ts": _epoch([e["end"] for e in events]),
+            "action": [e["event_type"] for e in events],
+            "summary": [e["summary"] for e in events],
+            "duration_minutes": [e["duration_minutes"] for e in events],
+        }
+    if source == "email":
+        return {
+            "ts": _epoch([e["timestamp"] for e in events]),
+            "action": ["sent" if e["is_sent"] else "received" for e in events],
+            "category": [e["category"] for e in events],
+            "priority": [e["priority"] for e in events],
+            "summary": [e["subject"] for e in events],
+            "is_sent": [int(e["is_sent"]) for e in events],
+        }
+    raise ValueError(f"Unknown source: {source}")
+
+
+class EventArchive:
+    """Append-only columnar event archive, one partition per user and month.
+
+    Each partition is a directory of raw little-endian column files; string
+    columns hold int32 codes into a per-user dicts.json. Reads memory-map only the
+    requested columns, so long-horizon scans never parse timestamps or build
+    dicts.
+
+    Appends are idempotent per event id: archived ids are kept in a per-user
+    ids.txt, so re-fetching after a restart (when the in-memory EventStore
+    sees every event as new) doesn't archive anything twice.
+    """
+
+    def __init__(self, root: str = ARCHIVE_DIR):
+        self.root = root
+        self.last_scan = {}
+        self._lock = threading.Lock()
+        self._dicts = {}  # user_id -> {column: {value: code}}
+        self._ids = {}    # user_id -> {"source:event_id"} already archived
+
+    def _user_dir(self, user_id: str) -> str:
+        return os.path.join(self.root, check_user_id(user_id))
+
+    def _partition(self, user_id: str, month: str) -> str:
+        return os.path.join(self._user_dir(user_id), month)
+
+    def _load_dicts(self, user_id: str) -> Dict[str, Dict[str, int]]:
+        if user_id not in self._dicts:
+            try:
+                with open(os.path.join(self._user_dir(user_id), "dicts.json")) as f:
+                    values = json.load(f)
+            except FileNotFoundError:
+                values = {c: [""] for c in DICT_COLUMNS}
+            self._dicts[user_id] = {c: {v: i for i, v in enumerate(values[c])} for c in DICT_COLUMNS}
+        return self._dicts[user_id]
+
+    def _save_dicts(self, user_id: str):
+        path = self._user_dir(user_id)
+        values = {c: list(d) for c, d in self._dicts[user_id].items()}
+        tmp = os.path.join(path, "dicts.json.tmp")
+        with open(tmp, "w") as f:
+            json.dump(values, f)
+        os.replace(tmp, os.path.join(path, "dicts.json"))
+
+    def _load_ids(self, user_id: str) -> set:
+        if user_id not in self._ids:
+            try:
+                with open(os.path.join(self._user_dir(user_id), "ids.txt")) as f:
+                    self._ids[user_id] = {line.rstrip("\n") for line in f}
+            except FileNotFoundError:
+                self._ids[user_id] = set()
+        return self._ids[user_id]
+
+    def append(self, user_id: str, source: str, events: List[Dict]) -> List[Dict]:
+        """Append events from one fetcher to the user's monthly partitions.
+
+        Events already archived (by id) are skipped; returns the ones written.
+        """
+        if not events:
+            return []
+        user_dir = self._user_dir(user_id)
+        with self._lock:
+            os.makedirs(user_dir, exist_ok=True)
+            archived = self._load_ids(user_id)
+            keys, fresh, seen = [], [], set()
+            for event in events:
+                key = f"{source}:{event.get('id') or event_id(source, event)}"
+                if key not in archived and key not in seen:
+                    keys.append(key)
+                    seen.add(key)
+                    fresh.append(event)
+            if not fresh:
+                return []
+            self._write_events(user_id, source, fresh)
+            # Ids go last: a crash in between can only re-archive, never lose
+            with open(os.path.join(user_dir, "ids.txt"), "a") as f:
+                f.writelines(k + "\n" for k in keys)
+            archived.update(keys)
+        return fresh
+
+    def _write_events(self, user_id: str, source: str, events: List[Dict]):
+        rows = _rows(source, events)
+        n = len(events)
+        ts = rows["ts"]
+        columns = {
+            "ts": ts,
+            "end_ts": rows.get("end_ts", ts),
+            "source": np.full(n, SOURCE_CODES[source]),
+        }
+        for name in ("duration_minutes", "lines_changed", "is_sent"):
+            columns[name] = np.asarray(rows.get(name, np.zeros(n)))
+        strings = {c: rows.get(c, [""] * n) for c in DICT_COLUMNS}
+
+        months = ts.astype("datetime64[s]").astype("datetime64[M]")
+        # Caller holds self._lock
+        dicts = self._load_dicts(user_id)
+        size_before = sum(len(d) for d in dicts.values())
+        for c in DICT_COLUMNS:
+            d = dicts[c]
+            columns[c] = np.array([d.setdefault(v, len(d)) for v in strings[c]], dtype=np.int32)
+        # Persist new dictionary entries before any codes referencing them
+        if sum(len(d) for d in dicts.values()) != size_before:
+            self._save_dicts(user_id)
+        for month in np.unique(months):
+            mask = months == month
+            path = self._partition(user_id, str(month))
+            os.makedirs(path, exist_ok=True)
+            for name in COLUMNS:
+                dtype = NUMERIC_COLUMNS.get(name, np.int32)
+                self._write(path, name, columns[name][mask].astype(dtype))
+
+    @staticmethod
+    def _write(path: str, column: str, values: np.ndarray):
+        with open(os.path.join(path, f"{column}.bin"), "ab") as f:
+            f.write(values.astype(values.dtype.newbyteorder("<")).tobytes())
+
+    def users(self) -> List[str]:
+        """Users with an archive on disk."""
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(
+            u for u in os.listdir(self.root)
+            if USER_ID_PATTERN.fullmatch(u) and os.path.isdir(self._user_dir(u))
+        )
+
+    def _months(self, user_id: str, start: int, end: int) -> List[str]:
+        user_dir = self._user_dir(user_id)
+        if not os.path.isdir(user_dir):
+            return []
+        first = str(np.datetime64(start, "s").astype("datetime64[M]"))
+        last = str(np.datetime64(end, "s").astype("datetime64[M]"))
+        return sorted(
+            m for m in os.listdir(user_dir)
+            if first <= m <= last and os.path.isdir(os.path.join(user_dir, m))
+        )
+
+    @staticmethod
+    def _map(path: str, column: str) -> np.ndarray:
+        dtype = np.dtype(NUMERIC_COLUMNS.get(column, np.int32)).newbyteorder("<")
+        file = os.path.join(path, f"{column}.bin")
+        if not os.path.exists(file) or os.path.getsize(file) == 0:
+            return np.empty(0, dtype=dtype)
+        # Only whole rows: a concurrent append may have half-written the tail
+        count = os.path.getsize(file) // dtype.itemsize
+        return np.memmap(file, dtype=dtype, mode="r", shape=(count,))
+
+    def scan(self, user_id: str, start: datetime, end: datetime,
+             columns: Iterable[str] = ("ts", "source"),
+             sources: Optional[Iterable[str]] = None) -> Dict[str, np.ndarray]:
+        """Return the requested columns for events in [start, end).
+
+        Dictionary columns come back as int32 codes; use decode() for strings.
+        Only the month partitions overlapping the range are opened.
+        """
+        t0 = time.perf_counter()
+        lo = int(np.datetime64(start, "s").astype(np.int64))
+        hi = int(np.datetime64(end, "s").astype(np.int64))
+        columns = list(columns)
+        wanted = [SOURCE_CODES[s] for s in sources] if sources else None
+        parts = {c: [] for c in columns}
+        months = self._months(user_id, lo, hi)
+        scanned = 0
+        for month in months:
+            path = self._partition(user_id, month)
+            ts = self._map(path, "ts")
+            n = len(ts)
+            mapped = {c: self._map(path, c)[:n] for c in columns if c != "ts"}
+            n = min([n] + [len(v) for v in mapped.values()])
+            mask = (ts[:n] >= lo) & (ts[:n] < hi)
+            if wanted is not None:
+                mask &= np.isin(self._map(path, "source")[:n], wanted)
+            scanned += n
+            for c in columns:
+                col = ts[:n] if c == "ts" else mapped[c][:n]
+                parts[c].append(np.asarray(col[mask]))
+        result = {
+            c: np.concatenate(p) if p else np.empty(0, dtype=NUMERIC_COLUMNS.get(c, np.int32))
+            for c, p in parts.items()
+        }
+        elapsed = time.perf_counter() - t0
+        self.last_scan = {
+            "partitions": len(months),
+            "events_scanned": scanned,
+            "events_matched": len(next(iter(result.values()))) if result else 0,
+            "seconds": round(elapsed, 6),
+            "events_per_sec": round(scanned / elapsed) if elapsed else None,
+        }
+        return result
+
+    def decode(self, user_id: str, column: str, codes: np.ndarray) -> List[str]:
+        """Map dictionary codes from scan() back to strings."""
+        dicts = self._load_dicts(user_id)
+        values = np.array(list(dicts[column]), dtype=object)
+        return values[codes].tolist()
+
+    def daily_counts(self, user_id: str, start: datetime, end: datetime) -> Dict:
+        """Per-day event counts, calendar minutes and lines changed over [start, end)."""
+        cols = self.scan(user_id, start, end,
+                         columns=("ts", "source", "duration_minutes", "lines_changed"))
+        lo = np.datetime64(start, "D")
+        days = max(1, int((np.datetime64(end, "D") - lo).astype(int)))
+        day = (cols["ts"] // 86400 - lo.astype(np.int64)).astype(np.int64)
+        day = np.clip(day, 0, days - 1)
+        series = {
+            f"{s}_events": np.bincount(day[cols["source"] == code], minlength=days)
+            for s, code in SOURCE_CODES.items()
+        }
+        is_cal = cols["source"] == SOURCE_CODES["calendar"]
+        series["calendar_minutes"] = np.bincount(day[is_cal], weights=cols["duration_minutes"][is_cal],
+                                                 minlength=days)
+        series["lines_changed"] = np.bincount(day, weights=cols["lines_changed"], minlength=days)
+        dates = np.arange(lo, lo + days).astype(str).tolist()
+        return {
+            "dates": dates,
+            **{k: v.astype(int).tolist() for k, v in series.items()},
+            "scan": self.last_scan,
+        }
+
+
+# global instance
+event_archive = EventArchive()
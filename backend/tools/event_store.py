@@ -0,0 +1,102 @@
+# event_store.py
+
+import hashlib
+import json
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from backend.tools.versions import versions
+
+# Field holding each source's event time, in "%Y-%m-%d %H:%M:%S" form
+TIME_FIELDS = {
+    "github": "timestamp",
+    "calendar": "start",
+    "email": "timestamp",
+}
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+# Field the sync cursor follows. Calendar events can be created or moved to
+# any start time, so its delta runs on last-modified time (updatedMin), not start
+CURSOR_FIELDS = {
+    "github": "timestamp",
+    "calendar": "updated",
+    "email": "timestamp",
+}
+
+
+def event_id(source: str, event: Dict) -> str:
+    """Stable id for an event: the upstream id when present, else a content hash."""
+    if event.get("id"):
+        return str(event["id"])
+    raw = json.dumps(event, sort_keys=True, default=str)
+    return f"{source}_{hashlib.sha1(raw.encode()).hexdigest()[:16]}"
+
+
+class EventStore:
+    """Local per-user, per-source event store with sync cursors.
+
+    Events are merged by id, so re-delivered deltas overwrite instead of
+    duplicating. The cursor for each (user, source) is the latest
+    CURSOR_FIELDS value seen plus the wall-clock time of the last sync.
+    """
+
+    def __init__(self):
+        self.events = {}    # user_id -> source -> {event_id: event}
+        self.cursors = {}   # user_id -> source -> {"last_seen": str, "synced_at": float}
+        self.stats = {"syncs": 0, "skipped_syncs": 0, "events_fetched": 0, "events_merged": 0}
+        self._lock = threading.Lock()
+
+    def get_cursor(self, user_id: str, source: str) -> Optional[Dict]:
+        return self.cursors.get(user_id, {}).get(source)
+
+    def merge(self, user_id: str, source: str, events: List[Dict]) -> List[Dict]:
+        """Upsert fetched events and advance the cursor. Returns the new ones."""
+        field = CURSOR_FIELDS[source]
+        with self._lock:
+            bucket = self.events.setdefault(user_id, {}).setdefault(source, {})
+            cursor = self.cursors.setdefault(user_id, {}).setdefault(
+                source, {"last_seen": None, "synced_at": 0.0}
+            )
+            new = []
+            changed = False
+            for event in events:
+                eid = event_id(source, event)
+                stored = {**event, "id": eid}
+                if eid not in bucket:
+                    new.append(stored)
+                changed = changed or bucket.get(eid) != stored
+                bucket[eid] = stored
+                # Events without a modified time can't move the cursor
+                mark = event.get(field)
+                if mark and (cursor["last_seen"] is None or mark > cursor["last_seen"]):
+                    cursor["last_seen"] = mark
+            cursor["synced_at"] = time.time()
+            self.stats["syncs"] += 1
+            self.stats["events_fetched"] += len(events)
+            self.stats["events_merged"] += len(new)
+        if changed:
+            versions.bump(user_id, "events", {"source": source, "new_events": len(new)})
+        return new
+
+    def get_events(self, user_id: str, source: str, days: int = 7) -> List[Dict]:
+        """Events from the last `days` days, oldest first."""
+        field = TIME_FIELDS[source]
+        cutoff = (datetime.now() - timedelta(days=days)).strftime(TIME_FORMAT)
+        with self._lock:
+            bucket = self.events.get(user_id, {}).get(source, {})
+            events = [e for e in bucket.values() if e[field] >= cutoff]
+        return sorted(events, key=lambda x: x[field])
+
+    def fingerprint(self, user_id: str, days: int = 7) -> str:
+        """Hash of the event ids in the user's window; changes whenever the
+        data an analysis would see changes."""
+        h = hashlib.sha1()
+        for source in sorted(TIME_FIELDS):
+            for event in self.get_events(user_id, source, days):
+                h.update(event["id"].encode())
+        return h.hexdigest()
+
+
+# global instance
+event_store = EventStore()
@@ -1,20 +1,32 @@
 from datetime import datetime, timedelta
 import random
 
-def fetch_activity(user_id: str):
+REPOS = ["auth-service", "timecop-backend", "user-dashboard", "api-gateway", "ml-pipeline"]
+ACTIONS = [
+    {"type": "commit", "weight": 40},
+    {"type": "pull_request", "weight": 20},
+    {"type": "code_review", "weight": 25},
+    {"type": "issue_created", "weight": 10},
+    {"type": "merge", "weight": 5}
+]
+COMMIT_MESSAGES = [
+    "Fix authentication bug in user login",
+    "Add error handling for API endpoints",
+    "Update user profile validation",
+    "Implement rate limiting middleware",
+    "Refactor database connection logic",
+    "Add unit tests for payment service",
+    "Update documentation for API changes",
+    "Fix memory leak in background jobs",
+    "Optimize database queries for dashboard",
+    "Add logging for debugging purposes"
+]
+
+def fetch_activity(user_id: str, since: str = None):
     """Enhanced GitHub activity simulation with realistic data patterns"""
     base_time = datetime.now() - timedelta(days=7)
     
     activities = []
-    repos = ["auth-service", "timecop-backend", "user-dashboard", "api-gateway", "ml-pipeline"]
-    actions = [
-        {"type": "commit", "weight": 40},
-        {"type": "pull_request", "weight": 20},
-        {"type": "code_review", "weight": 25},
-        {"type": "issue_created", "weight": 10},
-        {"type": "merge", "weight": 5}
-    ]
-    
     # Generate 15-25 activities over the past week
     for i in range(random.randint(15, 25)):
         activity_time = base_time + timedelta(
@@ -24,12 +36,12 @@ def fetch_activity(user_id: str):
         )
         
         action = random.choices(
-            [a["type"] for a in actions],
-            weights=[a["weight"] for a in actions]
+            [a["type"] for a in ACTIONS],
+            weights=[a["weight"] for a in ACTIONS]
         )[0]
         
         activity = {
-            "repo": random.choice(repos),
+            "repo": random.choice(REPOS),
             "action": action,
             "timestamp": activity_time.strftime("%Y-%m-%d %H:%M:%S"),
             "day_of_week": activity_time.strftime("%A"),
@@ -39,19 +51,11 @@ def fetch_activity(user_id: str):
         }
         activities.append(activity)
     
+    # `since` mirrors the upstream delta APIs: only events after the cursor
+    if since:
+        activities = [e for e in activities if e["timestamp"] > since]
+    
     return sorted(activities, key=lambda x: x["timestamp"])
 
 def generate_commit_message():
-    messages = [
-        "Fix authentication bug in user login",
-        "Add error handling for API endpoints",
-        "Update user profile validation",
-        "Implement rate limiting middleware",
-        "Refactor database connection logic",
-        "Add unit tests for payment service",
-        "Update documentation for API changes",
-        "Fix memory leak in background jobs",
-        "Optimize database queries for dashboard",
-        "Add logging for debugging purposes"
-    ]
-    return random.choice(messages)
\ No newline at end of file
+    return random.choice(COMMIT_MESSAGES)
@@ -1,26 +1,26 @@
 from datetime import datetime, timedelta
 import random
 
-def fetch_email_metadata(user_id: str):
+SUBJECTS = [
+    {"subject": "Weekly Team Sync Notes", "category": "meetings", "priority": "medium"},
+    {"subject": "Code Review Request - Auth Service", "category": "work", "priority": "high"},
+    {"subject": "Monthly Performance Report", "category": "reports", "priority": "high"},
+    {"subject": "Lunch plans for tomorrow?", "category": "personal", "priority": "low"},
+    {"subject": "Budget Approval Needed", "category": "admin", "priority": "high"},
+    {"subject": "Conference Registration Reminder", "category": "events", "priority": "medium"},
+    {"subject": "Project Timeline Update", "category": "work", "priority": "high"},
+    {"subject": "Happy Birthday!", "category": "personal", "priority": "low"},
+    {"subject": "System Maintenance Scheduled", "category": "notifications", "priority": "medium"},
+    {"subject": "Invoice #12345 - Payment Due", "category": "finance", "priority": "high"},
+    {"subject": "New Documentation Available", "category": "work", "priority": "low"},
+    {"subject": "Meeting Room Booking Confirmed", "category": "logistics", "priority": "low"}
+]
+
+def fetch_email_metadata(user_id: str, since: str = None):
     """Enhanced Gmail metadata with realistic email patterns"""
     base_time = datetime.now() - timedelta(days=7)
     
     emails = []
-    subjects = [
-        {"subject": "Weekly Team Sync Notes", "category": "meetings", "priority": "medium"},
-        {"subject": "Code Review Request - Auth Service", "category": "work", "priority": "high"},
-        {"subject": "Monthly Performance Report", "category": "reports", "priority": "high"},
-        {"subject": "Lunch plans for tomorrow?", "category": "personal", "priority": "low"},
-        {"subject": "Budget Approval Needed", "category": "admin", "priority": "high"},
-        {"subject": "Conference Registration Reminder", "category": "events", "priority": "medium"},
-        {"subject": "Project Timeline Update", "category": "work", "priority": "high"},
-        {"subject": "Happy Birthday!", "category": "personal", "priority": "low"},
-        {"subject": "System Maintenance Scheduled", "category": "notifications", "priority": "medium"},
-        {"subject": "Invoice #12345 - Payment Due", "category": "finance", "priority": "high"},
-        {"subject": "New Documentation Available", "category": "work", "priority": "low"},
-        {"subject": "Meeting Room Booking Confirmed", "category": "logistics", "priority": "low"}
-    ]
-    
     # Generate 20-35 emails over the past week
     for i in range(random.randint(20, 35)):
         email_time = base_time + timedelta(
@@ -29,7 +29,7 @@ def fetch_email_metadata(user_id: str):
             minutes=random.randint(0, 59)
         )
         
-        email_data = random.choice(subjects)
+        email_data = random.choice(SUBJECTS)
         
         email = {
             "subject": email_data["subject"],
@@ -43,4 +43,8 @@ def fetch_email_metadata(user_id: str):
         }
         emails.append(email)
     
+    # `since` mirrors the upstream delta APIs: only events after the cursor
+    if since:
+        emails = [e for e in emails if e["timestamp"] > since]
+    
     return sorted(emails, key=lambda x: x["timestamp"], reverse=True)
@@ -1,32 +1,39 @@
 from datetime import datetime, timedelta
 import random
 
-def fetch_events(user_id: str):
+MEETING_TYPES = [
+    {"summary": "Daily Standup", "duration": 30, "frequency": "daily", "attendees": 8},
+    {"summary": "Sprint Planning", "duration": 120, "frequency": "weekly", "attendees": 6},
+    {"summary": "Code Review Session", "duration": 60, "frequency": "regular", "attendees": 4},
+    {"summary": "Client Demo", "duration": 45, "frequency": "weekly", "attendees": 12},
+    {"summary": "One-on-One with Manager", "duration": 30, "frequency": "biweekly", "attendees": 2},
+    {"summary": "Architecture Discussion", "duration": 90, "frequency": "regular", "attendees": 5},
+    {"summary": "Team Retrospective", "duration": 60, "frequency": "biweekly", "attendees": 8},
+    {"summary": "Product Strategy Meeting", "duration": 75, "frequency": "monthly", "attendees": 10},
+    {"summary": "Technical Interview", "duration": 60, "frequency": "occasional", "attendees": 3},
+    {"summary": "Lunch & Learn Session", "duration": 45, "frequency": "weekly", "attendees": 15}
+]
+
+FOCUS_BLOCKS = [
+    "Deep Work - Feature Development",
+    "Focus Time - Bug Fixes",
+    "Coding Session - New API",
+    "Research & Documentation",
+    "Testing & QA Review"
+]
+
+def _updated(start: datetime, now: datetime) -> str:
+    """Last-modified time: events are booked or edited ahead of their start."""
+    booked = start - timedelta(hours=random.randint(1, 14 * 24))
+    return min(booked, now).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def fetch_events(user_id: str, since: str = None):
     """Enhanced Google Calendar with realistic meeting patterns"""
-    base_time = datetime.now() - timedelta(days=7)
+    now = datetime.now()
+    base_time = now - timedelta(days=7)
     
     events = []
-    meeting_types = [
-        {"summary": "Daily Standup", "duration": 30, "frequency": "daily", "attendees": 8},
-        {"summary": "Sprint Planning", "duration": 120, "frequency": "weekly", "attendees": 6},
-        {"summary": "Code Review Session", "duration": 60, "frequency": "regular", "attendees": 4},
-        {"summary": "Client Demo", "duration": 45, "frequency": "weekly", "attendees": 12},
-        {"summary": "One-on-One with Manager", "duration": 30, "frequency": "biweekly", "attendees": 2},
-        {"summary": "Architecture Discussion", "duration": 90, "frequency": "regular", "attendees": 5},
-        {"summary": "Team Retrospective", "duration": 60, "frequency": "biweekly", "attendees": 8},
-        {"summary": "Product Strategy Meeting", "duration": 75, "frequency": "monthly", "attendees": 10},
-        {"summary": "Technical Interview", "duration": 60, "frequency": "occasional", "attendees": 3},
-        {"summary": "Lunch & Learn Session", "duration": 45, "frequency": "weekly", "attendees": 15}
-    ]
-    
-    focus_blocks = [
-        "Deep Work - Feature Development",
-        "Focus Time - Bug Fixes",
-        "Coding Session - New API",
-        "Research & Documentation",
-        "Testing & QA Review"
-    ]
-    
     # Generate meetings (12-18 over the week)
     for i in range(random.randint(12, 18)):
         meeting_time = base_time + timedelta(
@@ -35,7 +42,7 @@ def fetch_events(user_id: str):
             minutes=random.choice([0, 15, 30, 45])
         )
         
-        meeting = random.choice(meeting_types)
+        meeting = random.choice(MEETING_TYPES)
         end_time = meeting_time + timedelta(minutes=meeting["duration"])
         
         event = {
@@ -46,7 +53,8 @@ def fetch_events(user_id: str):
             "attendees_count": meeting["attendees"],
             "event_type": "meeting",
             "day_of_week": meeting_time.strftime("%A"),
-            "is_recurring": meeting["frequency"] in ["daily", "weekly", "biweekly"]
+            "is_recurring": meeting["frequency"] in ["daily", "weekly", "biweekly"],
+            "updated": _updated(meeting_time, now),
         }
         events.append(event)
     
@@ -62,15 +70,21 @@ def fetch_events(user_id: str):
         end_time = focus_time + timedelta(minutes=duration)
         
         event = {
-            "summary": random.choice(focus_blocks),
+            "summary": random.choice(FOCUS_BLOCKS),
             "start": focus_time.strftime("%Y-%m-%d %H:%M:%S"),
             "end": end_time.strftime("%Y-%m-%d %H:%M:%S"),
             "duration_minutes": duration,
             "attendees_count": 1,
             "event_type": "focus_block",
             "day_of_week": focus_time.strftime("%A"),
-            "is_recurring": False
+            "is_recurring": False,
+            "updated": _updated(focus_time, now),
         }
         events.append(event)
     
+    # `since` mirrors events.list(updatedMin=...): events created or changed
+    # after the cursor, whatever their start time
+    if since:
+        events = [e for e in events if e["updated"] > since]
+    
     return sorted(events, key=lambda x: x["start"])
\ No newline at end of file
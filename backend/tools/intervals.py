@@ -0,0 +1,170 @@
+# intervals.py
+
+from collections import defaultdict
+from functools import cached_property
+from datetime import datetime, timedelta
+from typing import Dict, List, Tuple
+
+WORKDAY_START_HOUR = 9
+WORKDAY_END_HOUR = 18
+MIN_FREE_SLOT_MINUTES = 30
+
+Interval = Tuple[int, int]  # [start, end) in epoch seconds
+
+
+def _epoch(value: str) -> int:
+    # fromisoformat parses "%Y-%m-%d %H:%M:%S" several times faster than strptime
+    return int(datetime.fromisoformat(value).timestamp())
+
+
+def merge(intervals: List[Interval]) -> List[Interval]:
+    """Union of intervals as a sorted, non-overlapping list."""
+    out = []
+    for start, end in sorted(intervals):
+        if out and start <= out[-1][1]:
+            if end > out[-1][1]:
+                out[-1] = (out[-1][0], end)
+        else:
+            out.append((start, end))
+    return out
+
+
+def subtract(base: List[Interval], cut: List[Interval]) -> List[Interval]:
+    """base minus cut; both merged and sorted. Linear two-pointer sweep."""
+    out = []
+    j = 0
+    for start, end in base:
+        while j < len(cut) and cut[j][1] <= start:
+            j += 1
+        k = j
+        cursor = start
+        while k < len(cut) and cut[k][0] < end:
+            if cut[k][0] > cursor:
+                out.append((cursor, cut[k][0]))
+            cursor = max(cursor, cut[k][1])
+            k += 1
+        if cursor < end:
+            out.append((cursor, end))
+    return out
+
+
+class IntervalTree:
+    """Static augmented interval tree over a sorted array.
+
+    Intervals are sorted by start; the implicit balanced tree rooted at the
+    middle element stores the max end of each subtree, so overlap queries
+    prune whole subtrees and run in O(log n + k).
+    """
+
+    def __init__(self, intervals: List[Tuple[int, int, Dict]]):
+        self.items = sorted(intervals, key=lambda x: (x[0], x[1]))
+        self.max_end = [0] * len(self.items)
+        self._build(0, len(self.items))
+
+    def _build(self, lo: int, hi: int) -> int:
+        if lo >= hi:
+            return -1
+        mid = (lo + hi) // 2
+        self.max_end[mid] = max(self.items[mid][1], self._build(lo, mid), self._build(mid + 1, hi))
+        return self.max_end[mid]
+
+    def overlapping(self, start: int, end: int) -> List[Tuple[int, int, Dict]]:
+        """All stored intervals overlapping [start, end)."""
+        out = []
+        stack = [(0, len(self.items))]
+        while stack:
+            lo, hi = stack.pop()
+            if lo >= hi:
+                continue
+            mid = (lo + hi) // 2
+            if self.max_end[mid] <= start:
+                continue
+            stack.append((lo, mid))
+            s, e, _ = self.items[mid]
+            if s < end:
+                if e > start:
+                    out.append(self.items[mid])
+                stack.append((mid + 1, hi))
+        return sorted(out, key=lambda x: (x[0], x[1]))
+
+    def __len__(self):
+        return len(self.items)
+
+
+class CalendarIntervals:
+    """Focus/meeting interval analytics over google_calendar.fetch_events records.
+
+    The per-day summaries only need the sorted per-day lists; the interval
+    tree for ad-hoc range queries is built on first use of events_between.
+    """
+
+    def __init__(self, events: List[Dict]):
+        self.focus = defaultdict(list)     # "YYYY-MM-DD" -> [(start, end)]
+        self.meetings = defaultdict(list)
+        self._indexed = []
+        for e in events:
+            start, end = _epoch(e["start"]), _epoch(e["end"])
+            day = e["start"][:10]
+            bucket = self.focus if e["event_type"] == "focus_block" else self.meetings
+            bucket[day].append((start, end))
+            self._indexed.append((start, end, e))
+        self.days = sorted(set(self.focus) | set(self.meetings))
+
+    @cached_property
+    def tree(self) -> IntervalTree:
+        return IntervalTree(self._indexed)
+
+    def events_between(self, start: datetime, end: datetime) -> List[Dict]:
+        """Calendar events overlapping [start, end)."""
+        return [e for _, _, e in self.tree.overlapping(int(start.timestamp()), int(end.timestamp()))]
+
+    @staticmethod
+    def _workday(day: str) -> Interval:
+        midnight = datetime.strptime(day, "%Y-%m-%d")
+        return (int((midnight + timedelta(hours=WORKDAY_START_HOUR)).timestamp()),
+                int((midnight + timedelta(hours=WORKDAY_END_HOUR)).timestamp()))
+
+    def day_stats(self, day: str) -> Dict:
+        meetings = merge(self.meetings.get(day, []))
+        focus = merge(self.focus.get(day, []))
+        protected = subtract(focus, meetings)
+        workday = [self._workday(day)]
+        free = [
+            (s, e) for s, e in subtract(workday, merge(meetings + focus))
+            if e - s >= MIN_FREE_SLOT_MINUTES * 60
+        ]
+        net = sum(e - s for s, e in protected)
+        longest = max((e - s for s, e in protected), default=0)
+        between_meetings = subtract(workday, meetings)
+        free_total = sum(e - s for s, e in between_meetings)
+        longest_free = max((e - s for s, e in between_meetings), default=0)
+        return {
+            "date": day,
+            "scheduled_focus_hours": round(sum(e - s for s, e in focus) / 3600, 2),
+            "net_deep_work_hours": round(net / 3600, 2),
+            "meeting_hours": round(sum(e - s for s, e in meetings) / 3600, 2),
+            "longest_block_minutes": longest // 60,
+            # 0 = meetings leave one contiguous stretch, ->1 = time shredded into pieces
+            "fragmentation": round(1 - longest_free / free_total, 2) if free_total else 1.0,
+            "free_slots": [
+                {"start": datetime.fromtimestamp(s).strftime("%H:%M"),
+                 "end": datetime.fromtimestamp(e).strftime("%H:%M")}
+                for s, e in free
+            ],
+        }
+
+    def summary(self) -> List[Dict]:
+        return [self.day_stats(day) for day in self.days]
+
+
+def format_for_prompt(days: List[Dict]) -> str:
+    """Compact text version of CalendarIntervals.summary() for LLM prompts."""
+    lines = []
+    for d in days:
+        slots = ", ".join(f"{s['start']}-{s['end']}" for s in d["free_slots"]) or "none"
+        lines.append(
+            f"{d['date']}: {d['net_deep_work_hours']}h protected focus "
+            f"(of {d['scheduled_focus_hours']}h scheduled), longest block {d['longest_block_minutes']}m, "
+            f"fragmentation {d['fragmentation']}, free slots {slots}"
+        )
+    return "\n".join(lines)
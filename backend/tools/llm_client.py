@@ -0,0 +1,130 @@
+# llm_client.py
+
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Callable, Optional
+
+import google.generativeai as genai
+from dotenv import load_dotenv
+
+load_dotenv(".env", override=True)
+
+API_KEY = os.getenv("GEMINI_API_KEY")
+DEFAULT_MODEL = "gemini-2.5-flash"
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", 60))
+LLM_HEDGING = os.getenv("LLM_HEDGING", "false").lower() == "true"
+LLM_POOL_SIZE = int(os.getenv("LLM_POOL_SIZE", 16))
+# Hedge delay before enough latencies are recorded to estimate the p95
+HEDGE_DEFAULT_DELAY = float(os.getenv("LLM_HEDGE_DEFAULT_DELAY", 8))
+HEDGE_MIN_SAMPLES = 20
+LATENCY_WINDOW = 200
+# How often a waiting call checks whether its caller has given up
+CANCEL_POLL_SECONDS = 0.5
+
+
+class LLMClient:
+    """One pooled Gemini client shared by every agent.
+
+    Calls run on a shared thread pool so they can be timed out and hedged:
+    if the first attempt has not answered by the recent p95 latency, a second
+    identical attempt is fired and whichever answers first is used. Every
+    attempt sends the time left as its HTTP timeout, so an abandoned call
+    ends upstream too, and an attempt that waited in the queue past its
+    deadline (or whose caller cancelled) is dropped without being sent.
+    """
+
+    def __init__(self, model_name: str = DEFAULT_MODEL, pool_size: int = LLM_POOL_SIZE):
+        if not API_KEY:
+            raise ValueError("GEMINI_API_KEY not found in environment variables. Please check your .env file.")
+        genai.configure(api_key=API_KEY)
+        self.model_name = model_name
+        self._models = {}
+        self._pool = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="llm")
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self._lock = threading.Lock()
+        self.stats = {"calls": 0, "errors": 0, "timeouts": 0, "hedges_fired": 0, "hedges_won": 0}
+
+    def model(self, name: str = None) -> "genai.GenerativeModel":
+        name = name or self.model_name
+        if name not in self._models:
+            self._models[name] = genai.GenerativeModel(name)
+        return self._models[name]
+
+    def hedge_delay(self) -> float:
+        with self._lock:
+            samples = sorted(self._latencies)
+        if len(samples) < HEDGE_MIN_SAMPLES:
+            return HEDGE_DEFAULT_DELAY
+        return samples[int(0.95 * (len(samples) - 1))]
+
+    def _attempt(self, prompt: str, model_name: str, expires_at: float,
+                 cancelled: Callable[[], bool]) -> str:
+        remaining = expires_at - time.monotonic()
+        if remaining <= 0 or cancelled():
+            raise TimeoutError("LLM call abandoned before it was sent")
+        start = time.perf_counter()
+        text = self.model(model_name).generate_content(
+            prompt, request_options={"timeout": remaining}
+        ).text
+        with self._lock:
+            self._latencies.append(time.perf_counter() - start)
+        return text
+
+    def _count(self, key: str):
+        with self._lock:
+            self.stats[key] += 1
+
+    def generate(self, prompt: str, timeout: Optional[float] = None,
+                 hedge: Optional[bool] = None, model_name: str = None,
+                 cancelled: Callable[[], bool] = lambda: False) -> str:
+        """Return the response text, raising TimeoutError past `timeout`
+        seconds or once `cancelled()` turns true. The first error is
+        re-raised only if no attempt succeeds."""
+        timeout = LLM_TIMEOUT if timeout is None else timeout
+        hedge = LLM_HEDGING if hedge is None else hedge
+        deadline = time.monotonic() + timeout
+        self._count("calls")
+
+        primary = self._pool.submit(self._attempt, prompt, model_name, deadline, cancelled)
+        pending = {primary}
+        hedge_at = time.monotonic() + self.hedge_delay() if hedge else None
+
+        error = None
+        while pending:
+            now = time.monotonic()
+            if now >= deadline or cancelled():
+                break
+            if hedge_at is not None and now >= hedge_at:
+                hedge_at = None
+                self._count("hedges_fired")
+                pending.add(self._pool.submit(self._attempt, prompt, model_name, deadline, cancelled))
+            wake = min(deadline, hedge_at or deadline, now + CANCEL_POLL_SECONDS)
+            done, pending = wait(pending, timeout=wake - now, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is not primary:
+                        self._count("hedges_won")
+                    return future.result()
+                error = error or future.exception()
+        if error is not None and not pending:
+            self._count("errors")
+            raise error
+        self._count("timeouts")
+        raise TimeoutError(f"LLM call exceeded {timeout:.1f}s")
+
+    def get_stats(self) -> dict:
+        delay = self.hedge_delay()
+        with self._lock:
+            fired = self.stats["hedges_fired"]
+            return {
+                **self.stats,
+                "hedge_win_rate": round(self.stats["hedges_won"] / fired, 3) if fired else None,
+                "hedge_delay_seconds": round(delay, 3),
+            }
+
+
+# global instance
+llm_client = LLMClient()
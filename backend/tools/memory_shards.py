@@ -0,0 +1,291 @@
+# memory_shards.py
+
+import bisect
+import hashlib
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+from backend.tools.vector_memory import VectorMemoryStore
+from backend.tools.memory_snapshot import MemorySnapshotter, SNAPSHOT_DIR
+from backend.tools import team_analytics
+from backend.tools.versions import versions
+
+VIRTUAL_NODES = 64
+
+# Methods a shard worker will run on its VectorMemoryStore
+SHARD_METHODS = {
+    "store_summary", "store_summaries", "query_memory", "get_trends",
+    "get_documents", "user_ids", "export_user", "import_user", "team_slice",
+}
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.md5(key.encode()).digest()[:8], "big")
+
+
+class HashRing:
+    """Consistent-hash ring with virtual nodes: changing the shard count only
+    moves the users whose arc changed owner (~1/N of them)."""
+
+    def __init__(self, n_shards: int, vnodes: int = VIRTUAL_NODES):
+        points = sorted(
+            (_hash(f"shard-{shard}#{v}"), shard) for shard in range(n_shards) for v in range(vnodes)
+        )
+        self._keys = [p[0] for p in points]
+        self._shards = [p[1] for p in points]
+
+    def shard_for(self, user_id: str) -> int:
+        i = bisect.bisect(self._keys, _hash(user_id)) % len(self._keys)
+        return self._shards[i]
+
+
+def _worker(conn, index: int, n_shards: int, snapshot_root: str, restore: bool, snapshots: bool):
+    """Shard process: owns one VectorMemoryStore and serves calls over a pipe.
+
+    On start it restores the users the ring assigns it from the snapshots
+    under `snapshot_root`, then (if `snapshots`) snapshots its own store to
+    <snapshot_root>/shard-<index> in the background.
+    """
+    store = VectorMemoryStore()
+    if restore:
+        ring = HashRing(n_shards)
+        store.restore(snapshot_root, owns=lambda user_id: ring.shard_for(user_id) == index)
+    snapshotter = None
+    if snapshots:
+        snapshotter = MemorySnapshotter(store, os.path.join(snapshot_root, f"shard-{index}"))
+        snapshotter.start()
+    while True:
+        message = conn.recv()
+        if message is None:
+            break
+        method, args, kwargs = message
+        try:
+            if method in ("snapshot", "snapshot_stats") and snapshotter is None:
+                raise RuntimeError("Snapshots are disabled for this shard")
+            if method == "snapshot":
+                conn.send((True, snapshotter.snapshot()))
+            elif method == "snapshot_stats":
+                conn.send((True, snapshotter.get_stats()))
+            elif method not in SHARD_METHODS:
+                raise AttributeError(f"Unsupported shard method: {method}")
+            else:
+                conn.send((True, getattr(store, method)(*args, **kwargs)))
+        except Exception as e:
+            conn.send((False, e))
+    if snapshotter is not None:
+        snapshotter.stop()
+    conn.close()
+
+
+class _Shard:
+    def __init__(self, ctx, index: int, n_shards: int, snapshot_root: str = SNAPSHOT_DIR,
+                 restore: bool = True, snapshots: bool = True):
+        self.conn, child = ctx.Pipe()
+        self.process = ctx.Process(
+            target=_worker, args=(child, index, n_shards, snapshot_root, restore, snapshots), daemon=True
+        )
+        self.process.start()
+        child.close()
+        self.lock = threading.Lock()  # one in-flight request per pipe
+
+    def call(self, method: str, *args, **kwargs):
+        with self.lock:
+            self.conn.send((method, args, kwargs))
+            ok, result = self.conn.recv()
+        if not ok:
+            raise result
+        return result
+
+    def stop(self):
+        with self.lock:
+            self.conn.send(None)
+        # Generous: the worker takes a final snapshot before exiting
+        self.process.join(timeout=60)
+
+
+class ShardedMemoryStore:
+    """Drop-in for VectorMemoryStore that partitions users across processes.
+
+    Each worker process owns the documents, TF-IDF matrices and embeddings of
+    the users hashed to it, so fitting and similarity math for different
+    users run in parallel instead of sharing one GIL.
+
+    Workers restore from and snapshot to `snapshot_root`; `restore=False`
+    starts them empty and `snapshots=False` keeps them off disk entirely.
+    """
+
+    def __init__(self, n_shards: int, snapshot_root: str = SNAPSHOT_DIR,
+                 restore: bool = True, snapshots: bool = True):
+        self._ctx = multiprocessing.get_context("spawn")
+        self._snapshot_root = snapshot_root
+        self._snapshots = snapshots
+        self._shards = [
+            _Shard(self._ctx, i, n_shards, snapshot_root, restore, snapshots) for i in range(n_shards)
+        ]
+        self._ring = HashRing(n_shards)
+        # Calls run concurrently; resize() waits for them to drain and holds
+        # new ones back, so no write can land on a shard giving its user away
+        self._cond = threading.Condition()
+        self._active = 0
+        self._resizing = False
+
+    @property
+    def n_shards(self) -> int:
+        return len(self._shards)
+
+    def _call(self, user_id: str, method: str, *args, **kwargs):
+        with self._cond:
+            while self._resizing:
+                self._cond.wait()
+            self._active += 1
+            shard = self._shards[self._ring.shard_for(user_id)]
+        try:
+            return shard.call(method, user_id, *args, **kwargs)
+        finally:
+            with self._cond:
+                self._active -= 1
+                self._cond.notify_all()
+
+    # Workers bump their own process's versions; views are served from this one
+    def store_summary(self, user_id: str, summary: Dict, summary_type: str = "weekly") -> List[Dict]:
+        items = self._call(user_id, "store_summary", summary, summary_type)
+        versions.bump(user_id, "memory", {"items": items})
+        return items
+
+    def store_summaries(self, user_id: str, summaries: List[Dict], summary_type: str = "weekly") -> List[Dict]:
+        items = self._call(user_id, "store_summaries", summaries, summary_type)
+        versions.bump(user_id, "memory", {"items": items})
+        return items
+
+    def query_memory(self, user_id: str, query: str = None, limit: int = 5, mode: str = "hybrid") -> str:
+        return self._call(user_id, "query_memory", query=query, limit=limit, mode=mode)
+
+    def get_trends(self, user_id: str, weeks: int = 4) -> Dict:
+        return self._call(user_id, "get_trends", weeks=weeks)
+
+    def get_documents(self, user_id: str, limit: int = None) -> List[Dict]:
+        return self._call(user_id, "get_documents", limit=limit)
+
+    def user_ids(self) -> List[str]:
+        return [u for shard in list(self._shards) for u in shard.call("user_ids")]
+
+    def team_slice(self, user_ids: List[str], days: int = 7, summary_type: str = None) -> Dict:
+        """Each shard stacks its own users in parallel; the partial matrices
+        are then stacked once more here."""
+        with self._cond:
+            while self._resizing:
+                self._cond.wait()
+            self._active += 1
+            groups = {}
+            for user_id in user_ids:
+                groups.setdefault(self._ring.shard_for(user_id), []).append(user_id)
+            calls = [(self._shards[i], users) for i, users in groups.items()]
+        try:
+            with ThreadPoolExecutor(max_workers=max(1, len(calls))) as pool:
+                parts = list(pool.map(
+                    lambda c: c[0].call("team_slice", c[1], days=days, summary_type=summary_type), calls
+                ))
+        finally:
+            with self._cond:
+                self._active -= 1
+                self._cond.notify_all()
+        return team_analytics.stack(parts)
+
+    def resize(self, n_shards: int) -> Dict:
+        """Change the shard count and move users whose owner changed."""
+        with self._cond:
+            while self._resizing:
+                self._cond.wait()
+            self._resizing = True
+            while self._active:
+                self._cond.wait()
+        try:
+            old_shards = self._shards
+            # New workers start empty; their users are moved over live below
+            shards = old_shards[:n_shards] + [
+                _Shard(self._ctx, i, n_shards, self._snapshot_root, restore=False, snapshots=self._snapshots)
+                for i in range(len(old_shards), n_shards)
+            ]
+            ring = HashRing(n_shards)
+            moved = 0
+            for index, shard in enumerate(old_shards):
+                for user_id in shard.call("user_ids"):
+                    target = ring.shard_for(user_id)
+                    if target != index:
+                        docs = shard.call("export_user", user_id)
+                        shards[target].call("import_user", user_id, docs)
+                        moved += 1
+            for shard in old_shards[n_shards:]:
+                shard.stop()
+            self._shards, self._ring = shards, ring
+            # Persist the new placement before any caller can write again
+            if self._snapshots:
+                for shard in shards:
+                    shard.call("snapshot")
+            return {"shards": n_shards, "users_moved": moved}
+        finally:
+            with self._cond:
+                self._resizing = False
+                self._cond.notify_all()
+
+    def snapshot(self) -> Dict:
+        """Snapshot every shard now. Each worker answers nothing else while
+        its own snapshot is written; the periodic ones run in the background."""
+        return {"shards": [shard.call("snapshot") for shard in list(self._shards)]}
+
+    def snapshot_stats(self) -> Dict:
+        return {"shards": [shard.call("snapshot_stats") for shard in list(self._shards)]}
+
+    def close(self):
+        for shard in self._shards:
+            shard.stop()
+
+
+if __name__ == "__main__":
+    # Aggregate ingest and query throughput in-process and for 1, 2 and 4
+    # shards, plus the bare pipe round trip each sharded call pays
+    import random
+    import tempfile
+    words = ("focused coding energized tired meetings review deploy bug email standup "
+             "calm stressed productive sprint planning design docs lunch break walk").split()
+    users = [f"user_{i:03d}" for i in range(64)]
+    docs_per_user = 60
+
+    def ingest(store, user_id):
+        for _ in range(docs_per_user):
+            store.store_summary(user_id, {"llm_summary": " ".join(random.choices(words, k=30))}, "voice_log")
+
+    def query(store, user_id):
+        for _ in range(20):
+            store.query_memory(user_id, " ".join(random.choices(words, k=3)), mode="keyword")
+
+    def run(label, store, workers):
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            t0 = time.perf_counter()
+            list(pool.map(lambda u: ingest(store, u), users))
+            ingest_rate = len(users) * docs_per_user / (time.perf_counter() - t0)
+            t0 = time.perf_counter()
+            list(pool.map(lambda u: query(store, u), users))
+            query_rate = len(users) * 20 / (time.perf_counter() - t0)
+        print(f"{label}: ingest {ingest_rate:,.0f} docs/s, query {query_rate:,.0f} queries/s")
+
+    # Throwaway snapshot root, nothing restored or written: every store
+    # starts empty and the real snapshots are never touched
+    with tempfile.TemporaryDirectory() as root:
+        local = VectorMemoryStore()
+        run("in-process", local, 4)
+        for n in (1, 2, 4):
+            store = ShardedMemoryStore(n, snapshot_root=root, restore=False, snapshots=False)
+            store.user_ids()  # wait until every worker has started
+            t0 = time.perf_counter()
+            for _ in range(2000):
+                store.get_documents("nobody", limit=1)
+            print(f"{n} shard(s): pipe round trip {(time.perf_counter() - t0) / 2000 * 1e6:,.0f} µs")
+            run(f"{n} shard(s)", store, 4 * n)
+            if n == 4:
+                print("resize 4 -> 3:", store.resize(3))
+            store.close()
@@ -0,0 +1,253 @@
+# memory_snapshot.py
+
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+SNAPSHOT_DIR = os.getenv("MEMORY_SNAPSHOT_DIR", os.path.join(".cache", "memory_snapshots"))
+# Seconds between background snapshots; 0 leaves only the one taken on shutdown
+SNAPSHOT_INTERVAL = float(os.getenv("MEMORY_SNAPSHOT_INTERVAL", 300))
+KEEP_SNAPSHOTS = 2
+FORMAT_VERSION = 1
+
+# Raw little-endian arrays, each concatenated across users; the manifest
+# holds every user's [start, end) slice. indptr is stored per user (each
+# slice starts at 0) so a slice is directly a CSR indptr.
+ARRAYS = {
+    "csr_data": np.float64,
+    "csr_indices": np.int32,
+    "csr_indptr": np.int32,
+    "idf": np.float64,
+    "embeddings": np.float32,
+}
+
+
+def _dtype(name: str) -> np.dtype:
+    return np.dtype(ARRAYS[name]).newbyteorder("<")
+
+
+class _Writer:
+    """Appends arrays to the snapshot's column files, tracking offsets."""
+
+    def __init__(self, path: str):
+        self.files = {name: open(os.path.join(path, f"{name}.bin"), "wb") for name in ARRAYS}
+        self.sizes = dict.fromkeys(ARRAYS, 0)
+
+    def write(self, name: str, values: np.ndarray) -> List[int]:
+        values = np.ascontiguousarray(values, dtype=_dtype(name))
+        self.files[name].write(values.tobytes())
+        start = self.sizes[name]
+        self.sizes[name] += values.size
+        return [start, self.sizes[name]]
+
+    def close(self):
+        for f in self.files.values():
+            f.close()
+
+
+def write_snapshot(state: Dict[str, tuple], root: str = SNAPSHOT_DIR) -> Dict:
+    """Write captured store state to a new snapshot directory under `root`.
+
+    `state` maps user_id -> (documents, vectorizer, tfidf matrix, embeddings)
+    as returned by VectorMemoryStore.capture(). The directory is built under
+    a temporary name and renamed into place, then CURRENT is switched to it,
+    so readers only ever see complete snapshots.
+    """
+    t0 = time.perf_counter()
+    os.makedirs(root, exist_ok=True)
+    name = str(time.time_ns())
+    tmp = os.path.join(root, f".tmp-{name}")
+    os.makedirs(tmp)
+    writer = _Writer(tmp)
+    users, documents = {}, {}
+    terms = []
+    try:
+        for user_id, (docs, vectorizer, matrix, embeddings) in state.items():
+            entry = {"n_docs": len(docs)}
+            documents[user_id] = [{k: v for k, v in d.items() if k != "embedding"} for d in docs]
+            if matrix is not None and vectorizer is not None:
+                vocab = sorted(vectorizer.vocabulary_, key=vectorizer.vocabulary_.get)
+                entry["tfidf"] = {
+                    "shape": list(matrix.shape),
+                    "data": writer.write("csr_data", matrix.data),
+                    "indices": writer.write("csr_indices", matrix.indices),
+                    "indptr": writer.write("csr_indptr", matrix.indptr),
+                    "idf": writer.write("idf", vectorizer.idf_),
+                    "vocab": [len(terms), len(terms) + len(vocab)],
+                }
+                terms.extend(vocab)
+            if embeddings is not None:
+                entry["embeddings"] = {
+                    "shape": list(embeddings.shape),
+                    "values": writer.write("embeddings", embeddings.ravel()),
+                    "embedded": [i for i, d in enumerate(docs[:len(embeddings)]) if "embedding" in d],
+                }
+            users[user_id] = entry
+    finally:
+        writer.close()
+
+    # Token patterns never match newlines, so terms are newline-separated
+    with open(os.path.join(tmp, "vocab.txt"), "w", encoding="utf-8") as f:
+        f.write("\n".join(terms))
+    with open(os.path.join(tmp, "documents.json"), "w") as f:
+        json.dump(documents, f, default=str)
+    manifest = {"version": FORMAT_VERSION, "created_at": time.time(), "users": users}
+    with open(os.path.join(tmp, "manifest.json"), "w") as f:
+        json.dump(manifest, f)
+
+    os.rename(tmp, os.path.join(root, name))
+    pointer = os.path.join(root, "CURRENT.tmp")
+    with open(pointer, "w") as f:
+        f.write(name)
+    os.replace(pointer, os.path.join(root, "CURRENT"))
+    _prune(root, keep=name)
+    return {
+        "snapshot": name,
+        "users": len(users),
+        "documents": sum(u["n_docs"] for u in users.values()),
+        "bytes": sum(
+            os.path.getsize(os.path.join(root, name, f)) for f in os.listdir(os.path.join(root, name))
+        ),
+        "seconds": round(time.perf_counter() - t0, 4),
+    }
+
+
+def _prune(root: str, keep: str):
+    """Drop all but the newest KEEP_SNAPSHOTS snapshots and stale temp dirs.
+
+    Arrays already memory-mapped from a deleted snapshot stay readable.
+    """
+    names = sorted((n for n in os.listdir(root) if n.isdigit()), key=int)
+    stale = names[:-KEEP_SNAPSHOTS] + [n for n in os.listdir(root) if n.startswith(".tmp-")
+                                       and n != f".tmp-{keep}"]
+    for n in stale:
+        shutil.rmtree(os.path.join(root, n), ignore_errors=True)
+
+
+def current_snapshot(root: str = SNAPSHOT_DIR) -> Optional[str]:
+    try:
+        with open(os.path.join(root, "CURRENT")) as f:
+            path = os.path.join(root, f.read().strip())
+    except FileNotFoundError:
+        return None
+    return path if os.path.exists(os.path.join(path, "manifest.json")) else None
+
+
+def snapshot_paths(root: str = SNAPSHOT_DIR) -> List[str]:
+    """Current snapshots under `root` and its shard-* subdirectories, oldest
+    first, so applying them in order leaves each user's newest copy."""
+    roots = [root]
+    if os.path.isdir(root):
+        roots += [os.path.join(root, n) for n in sorted(os.listdir(root)) if n.startswith("shard-")]
+    paths = [p for p in map(current_snapshot, roots) if p is not None]
+    return sorted(paths, key=lambda p: int(os.path.basename(p)))
+
+
+def read_snapshot(path: str, owns: Callable[[str], bool] = None) -> Dict:
+    """Load a snapshot directory written by write_snapshot().
+
+    Returns {"created_at", "users": {user_id: (documents, tfidf, embeddings)}}
+    where tfidf is (vocabulary, idf, csr matrix) or None. Numeric arrays are
+    memory-mapped, not read; `owns` restricts loading to some users.
+    """
+    with open(os.path.join(path, "manifest.json")) as f:
+        manifest = json.load(f)
+    if manifest["version"] != FORMAT_VERSION:
+        raise ValueError(f"Unsupported memory snapshot version: {manifest['version']}")
+    with open(os.path.join(path, "documents.json")) as f:
+        documents = json.load(f)
+    with open(os.path.join(path, "vocab.txt"), encoding="utf-8") as f:
+        terms = f.read().split("\n")
+    arrays = {}
+    for name in ARRAYS:
+        file = os.path.join(path, f"{name}.bin")
+        size = os.path.getsize(file) // _dtype(name).itemsize
+        arrays[name] = (np.memmap(file, dtype=_dtype(name), mode="r", shape=(size,))
+                        if size else np.empty(0, dtype=_dtype(name)))
+
+    def piece(name, span):
+        return arrays[name][span[0]:span[1]]
+
+    users = {}
+    for user_id, entry in manifest["users"].items():
+        if owns is not None and not owns(user_id):
+            continue
+        docs = documents[user_id]
+        tfidf = None
+        if "tfidf" in entry:
+            t = entry["tfidf"]
+            start, end = t["vocab"]
+            vocabulary = {term: i for i, term in enumerate(terms[start:end])}
+            matrix = csr_matrix(
+                (piece("csr_data", t["data"]), piece("csr_indices", t["indices"]),
+                 piece("csr_indptr", t["indptr"])),
+                shape=tuple(t["shape"]), copy=False,
+            )
+            tfidf = (vocabulary, np.asarray(piece("idf", t["idf"])), matrix)
+        embeddings = None
+        if "embeddings" in entry:
+            e = entry["embeddings"]
+            embeddings = piece("embeddings", e["values"]).reshape(e["shape"])
+            for i in e["embedded"]:
+                docs[i]["embedding"] = embeddings[i]
+        users[user_id] = (docs, tfidf, embeddings)
+    return {"created_at": manifest["created_at"], "users": users}
+
+
+class MemorySnapshotter:
+    """Background thread that snapshots a store every `interval` seconds.
+
+    Only the capture (copying per-user references) holds the store's lock;
+    serialization runs outside it, so writes are never paused for I/O.
+    """
+
+    def __init__(self, store, root: str = SNAPSHOT_DIR, interval: float = SNAPSHOT_INTERVAL):
+        self.store = store
+        self.root = root
+        self.interval = interval
+        self.last = None
+        self.stats = {"snapshots": 0, "failures": 0}
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()  # one snapshot at a time per root
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            try:
+                self.last = self.store.snapshot(self.root)
+                self.stats["snapshots"] += 1
+                return self.last
+            except Exception:
+                self.stats["failures"] += 1
+                raise
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.snapshot()
+            except Exception as e:
+                logging.error("Memory snapshot failed: %s", e)
+
+    def start(self):
+        if self.interval > 0 and self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="memory-snapshot", daemon=True)
+            self._thread.start()
+
+    def stop(self, final: bool = True):
+        """Stop the thread, taking one last snapshot so a restart loses nothing."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if final:
+            self.snapshot()
+
+    def get_stats(self) -> Dict:
+        return {**self.stats, "interval_seconds": self.interval, "last": self.last}
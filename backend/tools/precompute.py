@@ -0,0 +1,162 @@
+# precompute.py
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from datetime import date, datetime
+from typing import Dict, Optional
+
+from backend.tools.context_switch import detect_switches, format_for_prompt
+from backend.tools import intervals
+
+# Local hours during which the scheduler may run, "start-end" (end exclusive)
+OFFPEAK_HOURS = os.getenv("PRECOMPUTE_OFFPEAK_HOURS", "1-6")
+PRECOMPUTE_CONCURRENCY = int(os.getenv("PRECOMPUTE_CONCURRENCY", 2))
+DAILY_LLM_BUDGET = int(os.getenv("PRECOMPUTE_DAILY_LLM_BUDGET", 300))
+MAX_AGE_HOURS = float(os.getenv("PRECOMPUTE_MAX_AGE_HOURS", 24))
+ACTIVE_DAYS = float(os.getenv("PRECOMPUTE_ACTIVE_DAYS", 7))
+CHECK_INTERVAL_SECONDS = float(os.getenv("PRECOMPUTE_CHECK_INTERVAL", 900))
+# analyze_logs + generate_insights; coaching depends on the query and runs live
+LLM_CALLS_PER_USER = 2
+
+
+def _in_window(hour: int, window: str = OFFPEAK_HOURS) -> bool:
+    start, end = (int(h) for h in window.split("-"))
+    return start <= hour < end if start <= end else hour >= start or hour < end
+
+
+class PrecomputeScheduler:
+    """Precomputes analysis and insights for recently active users during
+    off-peak hours.
+
+    Results carry the event-store fingerprint of the data they were built
+    from; /analyze only reuses one while that fingerprint still matches and
+    it is younger than MAX_AGE_HOURS.
+    """
+
+    def __init__(self, fetcher, analyzer, insight, memory_store,
+                 concurrency: int = PRECOMPUTE_CONCURRENCY, daily_budget: int = DAILY_LLM_BUDGET):
+        self.fetcher = fetcher
+        self.analyzer = analyzer
+        self.insight = insight
+        self.memory_store = memory_store
+        self.concurrency = concurrency
+        self.daily_budget = daily_budget
+        self.results = {}     # user_id -> precomputed result
+        self.last_seen = {}   # user_id -> epoch seconds of last request
+        self.stats = {"runs": 0, "users_computed": 0, "failures": 0, "served": 0, "stale": 0,
+                      "budget_exhausted": 0}
+        self._budget_day = date.today()
+        self._llm_calls_today = 0
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    def touch(self, user_id: str):
+        self.last_seen[user_id] = time.time()
+
+    def fingerprint(self, user_id: str) -> str:
+        return self.fetcher.store.fingerprint(user_id)
+
+    def get_fresh(self, user_id: str) -> Optional[Dict]:
+        """The precomputed result if it still matches the user's data."""
+        result = self.results.get(user_id)
+        if result is None:
+            return None
+        age_hours = (time.time() - result["computed_at"]) / 3600
+        if age_hours > MAX_AGE_HOURS or result["fingerprint"] != self.fingerprint(user_id):
+            self.stats["stale"] += 1
+            return None
+        self.stats["served"] += 1
+        return result
+
+    def _reserve_budget(self) -> bool:
+        with self._lock:
+            if date.today() != self._budget_day:
+                self._budget_day, self._llm_calls_today = date.today(), 0
+            if self._llm_calls_today + LLM_CALLS_PER_USER > self.daily_budget:
+                self.stats["budget_exhausted"] += 1
+                return False
+            self._llm_calls_today += LLM_CALLS_PER_USER
+            return True
+
+    def precompute_user(self, user_id: str) -> bool:
+        """Run the non-query-specific part of /analyze for one user."""
+        logs = self.fetcher.fetch_all_logs(user_id)
+        fingerprint = self.fingerprint(user_id)
+        switches = detect_switches(logs["github"], logs["calendar"], logs["email"][::-1])
+        analyzed = self.analyzer.analyze_logs({**logs, "user_query": None}, format_for_prompt(switches))
+        insights = self.insight.generate_insights(analyzed)
+        if "error" in (analyzed.get("status"), insights.get("status")):
+            self.stats["failures"] += 1
+            return False
+        self.memory_store.store_summary(user_id, insights, "analysis")
+        schedule = intervals.format_for_prompt(intervals.CalendarIntervals(logs["calendar"]).summary())
+        self.results[user_id] = {
+            "fingerprint": fingerprint,
+            "computed_at": time.time(),
+            "analysis": analyzed,
+            "insights": insights,
+            "schedule": schedule,
+        }
+        self.stats["users_computed"] += 1
+        return True
+
+    def due_users(self):
+        """Recently active users whose precomputed result is missing or stale."""
+        cutoff = time.time() - ACTIVE_DAYS * 86400
+        due = []
+        for user_id, seen in sorted(self.last_seen.items(), key=lambda x: -x[1]):
+            if seen < cutoff:
+                continue
+            result = self.results.get(user_id)
+            if (result is None or result["fingerprint"] != self.fingerprint(user_id)
+                    or time.time() - result["computed_at"] > MAX_AGE_HOURS * 3600):
+                due.append(user_id)
+        return due
+
+    async def run_once(self) -> int:
+        """Precompute every due user, `concurrency` at a time, within budget."""
+        self.stats["runs"] += 1
+        semaphore = asyncio.Semaphore(self.concurrency)
+        computed = 0
+
+        async def one(user_id):
+            nonlocal computed
+            async with semaphore:
+                if not self._reserve_budget():
+                    return
+                try:
+                    if await asyncio.to_thread(self.precompute_user, user_id):
+                        computed += 1
+                except Exception as e:
+                    self.stats["failures"] += 1
+                    logging.error("Precompute failed for %s: %s", user_id, e)
+
+        await asyncio.gather(*(one(u) for u in self.due_users()))
+        return computed
+
+    async def _loop(self):
+        while True:
+            if _in_window(datetime.now().hour):
+                await self.run_once()
+            await asyncio.sleep(CHECK_INTERVAL_SECONDS)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_event_loop().create_task(self._loop())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def get_stats(self) -> Dict:
+        return {
+            **self.stats,
+            "cached_users": len(self.results),
+            "llm_calls_today": self._llm_calls_today,
+            "daily_llm_budget": self.daily_budget,
+            "offpeak_hours": OFFPEAK_HOURS,
+        }
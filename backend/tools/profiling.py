@@ -0,0 +1,361 @@
+# profiling.py
+
+import asyncio
+import hmac
+import html
+import json
+import os
+import random
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+import zlib
+from collections import Counter, OrderedDict
+from typing import Dict, List, Optional
+
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(".cache", "profiles"))
+# Fraction of requests profiled without asking; 0 = only on request
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", 0))
+# Secret for profiling on demand: X-Profile must carry it to profile a request
+# and X-Profile-Token to read profiles. Unset = header profiling and reads off
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN", "")
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL_MS", 5)) / 1000
+PROFILE_MAX_CONCURRENT = int(os.getenv("PROFILE_MAX_CONCURRENT", 2))
+PROFILE_MAX_STORED = int(os.getenv("PROFILE_MAX_STORED", 50))
+PROFILE_HEADER = b"x-profile"
+REQUEST_ID_HEADER = b"x-request-id"
+TRACEMALLOC_FRAMES = 25
+MAX_STACK_DEPTH = 64
+TOP_N = 20
+
+APP_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# A stack outside this package whose innermost frame is one of these is an
+# idle pool or event-loop thread and is left out of the graph. Framework
+# work on the loop (form parsing, response serialization) is kept.
+IDLE_WAITS = {"select", "poll", "wait", "_wait_for_tstate_lock", "accept", "sleep", "_worker"}
+# Long-lived app threads that mostly sleep in app code
+BACKGROUND_THREADS = {"memory-snapshot"}
+
+
+def _label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class _Sampler(threading.Thread):
+    """Samples every thread's stack at a fixed interval.
+
+    Samples are folded into "thread;outer;...;inner" -> count. Concurrent
+    requests running at the same time appear in the same profile.
+    """
+
+    def __init__(self, interval: float):
+        super().__init__(name="profile-sampler", daemon=True)
+        self.interval = interval
+        self.folded = Counter()
+        self.app_frames = set()  # labels of frames in this package
+        self.samples = 0
+        self.idle_samples = 0
+        self._halt = threading.Event()
+
+    def run(self):
+        me = threading.get_ident()
+        while not self._halt.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me or names.get(ident) in BACKGROUND_THREADS:
+                    continue
+                idle = frame.f_code.co_name in IDLE_WAITS
+                stack, in_app = [], False
+                while frame is not None and len(stack) < MAX_STACK_DEPTH:
+                    label = _label(frame)
+                    filename = frame.f_code.co_filename
+                    if filename.startswith(APP_ROOT) and filename != __file__:
+                        in_app = True
+                        self.app_frames.add(label)
+                    stack.append(label)
+                    frame = frame.f_back
+                self.samples += 1
+                if idle and not in_app:
+                    self.idle_samples += 1
+                    continue
+                stack.append(names.get(ident, str(ident)))
+                self.folded[";".join(reversed(stack))] += 1
+
+    def stop(self):
+        self._halt.set()
+        self.join()
+
+
+class Profile:
+    def __init__(self, request_id: str, method: str, path: str, reason: str):
+        self.request_id = request_id
+        self.method = method
+        self.path = path
+        self.reason = reason
+        self.started_at = time.time()
+        self._t0 = time.perf_counter()
+        self.status = None
+        self.sampler = _Sampler(PROFILE_INTERVAL)
+        self.allocations_before = None
+
+
+class RequestProfiler:
+    """Opt-in per-request profiling: a sampling profiler plus tracemalloc.
+
+    A request is profiled when its X-Profile header carries PROFILE_TOKEN
+    (ignored when no token is configured) or it falls in the operator-set
+    PROFILE_SAMPLE_RATE sample. Results
+    are stored by request id under PROFILE_DIR: a JSON summary (top frames,
+    allocation diff, peak memory), folded stacks and an SVG flamegraph.
+    Unprofiled requests only pay for one header lookup.
+    """
+
+    def __init__(self, root: str = PROFILE_DIR, sample_rate: float = PROFILE_SAMPLE_RATE,
+                 max_concurrent: int = PROFILE_MAX_CONCURRENT, max_stored: int = PROFILE_MAX_STORED,
+                 token: str = PROFILE_TOKEN):
+        self.root = root
+        self.sample_rate = sample_rate
+        self.token = token
+        self.max_concurrent = max_concurrent
+        self.max_stored = max_stored
+        self.index = OrderedDict()  # request_id -> summary without the heavy parts
+        self.stats = {"profiled": 0, "skipped_busy": 0}
+        self._active = 0
+        self._started_tracemalloc = False
+        self._lock = threading.Lock()
+        self._load_index()
+
+    def _load_index(self):
+        if not os.path.isdir(self.root):
+            return
+        summaries = []
+        for name in os.listdir(self.root):
+            if name.endswith(".json"):
+                try:
+                    with open(os.path.join(self.root, name)) as f:
+                        summaries.append(self._headline(json.load(f)))
+                except (OSError, ValueError):
+                    continue
+        for s in sorted(summaries, key=lambda s: s["started_at"])[-self.max_stored:]:
+            self.index[s["request_id"]] = s
+
+    def authorized(self, token: Optional[str]) -> bool:
+        """Whether `token` matches the configured PROFILE_TOKEN (never when unset)."""
+        return bool(self.token) and token is not None and hmac.compare_digest(
+            token.encode(), self.token.encode()
+        )
+
+    def wants(self, headers: Dict[bytes, bytes]) -> Optional[str]:
+        """Why this request should be profiled, or None."""
+        value = headers.get(PROFILE_HEADER)
+        if value is not None and self.authorized(value.decode("latin-1")):
+            return "header"
+        if self.sample_rate > 0 and random.random() < self.sample_rate:
+            return "sampled"
+        return None
+
+    def begin(self, request_id: str, method: str, path: str, reason: str) -> Optional[Profile]:
+        with self._lock:
+            if self._active >= self.max_concurrent:
+                self.stats["skipped_busy"] += 1
+                return None
+            self._active += 1
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(TRACEMALLOC_FRAMES)
+                self._started_tracemalloc = True
+            if self._active == 1:
+                tracemalloc.reset_peak()
+        profile = Profile(request_id, method, path, reason)
+        profile.allocations_before = tracemalloc.take_snapshot()
+        profile.sampler.start()
+        return profile
+
+    def end(self, profile: Profile):
+        """Stop sampling and write the results (run off the event loop)."""
+        profile.sampler.stop()
+        wall = time.perf_counter() - profile._t0
+        after = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        with self._lock:
+            self._active -= 1
+            if self._active == 0 and self._started_tracemalloc:
+                tracemalloc.stop()
+                self._started_tracemalloc = False
+
+        ignore = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+        diff = after.filter_traces(ignore).compare_to(profile.allocations_before.filter_traces(ignore), "lineno")
+        sampler = profile.sampler
+        # Inclusive time for app frames (where the request spends its time),
+        # self time for leaves (what it is actually doing: decoding, waiting
+        # on a socket, refitting, serializing)
+        inclusive, leaves = Counter(), Counter()
+        for stack, count in sampler.folded.items():
+            frames = stack.split(";")[1:]
+            for frame in set(frames) & sampler.app_frames:
+                inclusive[frame] += count
+            leaves[frames[-1]] += count
+        busy = sum(sampler.folded.values())
+        summary = {
+            "request_id": profile.request_id,
+            "method": profile.method,
+            "path": profile.path,
+            "status": profile.status,
+            "reason": profile.reason,
+            "started_at": profile.started_at,
+            "wall_seconds": round(wall, 4),
+            "sample_interval_ms": sampler.interval * 1000,
+            "samples": sampler.samples,
+            "idle_samples": sampler.idle_samples,
+            "top_frames": [
+                {"frame": frame, "samples": n, "percent": round(100 * n / busy, 1)}
+                for frame, n in inclusive.most_common(TOP_N)
+            ],
+            "top_leaf_frames": [
+                {"frame": frame, "samples": n, "percent": round(100 * n / busy, 1)}
+                for frame, n in leaves.most_common(TOP_N)
+            ],
+            "memory": {
+                "peak_traced_bytes": peak,
+                "traced_bytes_at_end": current,
+                "net_allocated_bytes": sum(d.size_diff for d in diff),
+            },
+            "allocations": [
+                {"location": str(d.traceback[0]), "size_diff": d.size_diff, "count_diff": d.count_diff}
+                for d in diff[:TOP_N] if d.size_diff
+            ],
+        }
+        os.makedirs(self.root, exist_ok=True)
+        base = os.path.join(self.root, profile.request_id)
+        with open(f"{base}.folded", "w") as f:
+            f.writelines(f"{stack} {count}\n" for stack, count in sampler.folded.items())
+        with open(f"{base}.svg", "w") as f:
+            f.write(flamegraph_svg(sampler.folded, f"{profile.method} {profile.path} "
+                                                   f"({wall * 1000:.0f} ms, {busy} samples)"))
+        with open(f"{base}.json", "w") as f:
+            json.dump(summary, f)
+        with self._lock:
+            self.index[profile.request_id] = self._headline(summary)
+            self.stats["profiled"] += 1
+            evicted = []
+            while len(self.index) > self.max_stored:
+                evicted.append(self.index.popitem(last=False)[0])
+        for request_id in evicted:
+            for ext in ("json", "svg", "folded"):
+                try:
+                    os.remove(os.path.join(self.root, f"{request_id}.{ext}"))
+                except FileNotFoundError:
+                    pass
+
+    @staticmethod
+    def _headline(summary: Dict) -> Dict:
+        keys = ("request_id", "method", "path", "status", "reason", "started_at", "wall_seconds")
+        return {k: summary.get(k) for k in keys}
+
+    def list(self) -> List[Dict]:
+        with self._lock:
+            return list(reversed(self.index.values()))
+
+    def path(self, request_id: str, ext: str) -> Optional[str]:
+        if request_id not in self.index:
+            return None
+        path = os.path.join(self.root, f"{request_id}.{ext}")
+        return path if os.path.exists(path) else None
+
+
+def flamegraph_svg(folded: Dict[str, int], title: str, width: int = 1200, row: int = 16) -> str:
+    """Render folded stacks as a self-contained SVG flamegraph (root at the
+    bottom, width proportional to samples; hover for the full frame)."""
+    tree = {"children": {}, "count": 0}
+    for stack, count in folded.items():
+        node = tree
+        node["count"] += count
+        for frame in stack.split(";"):
+            node = node["children"].setdefault(frame, {"children": {}, "count": 0})
+            node["count"] += count
+
+    def depth(node):
+        return 1 + max((depth(c) for c in node["children"].values()), default=0)
+
+    levels = depth(tree) - 1
+    height = (levels + 2) * row + 10
+    total = tree["count"] or 1
+    rects = []
+
+    def layout(node, x, level):
+        for name, child in sorted(node["children"].items()):
+            w = width * child["count"] / total
+            if w >= 0.5:
+                y = height - (level + 1) * row - 5
+                hue = 20 + zlib.crc32(name.encode()) % 40
+                label = html.escape(name)
+                # ~7px per character; truncate or drop labels that don't fit
+                if w > 7 * len(name):
+                    text = label
+                elif w > 21:
+                    text = html.escape(name[:int(w / 7) - 2]) + ".."
+                else:
+                    text = ""
+                rects.append(
+                    f'<g><title>{label} ({child["count"]} samples, '
+                    f'{100 * child["count"] / total:.1f}%)</title>'
+                    f'<rect x="{x:.1f}" y="{y}" width="{w:.1f}" height="{row - 1}" '
+                    f'fill="hsl({hue},85%,60%)"/>'
+                    f'<text x="{x + 3:.1f}" y="{y + row - 4}">{text}</text></g>'
+                )
+                layout(child, x, level + 1)
+            x += w
+
+    layout(tree, 0.0, 0)
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+        f'font-family="monospace" font-size="11">'
+        f'<text x="5" y="14" font-size="13">{html.escape(title)}</text>'
+        + "".join(rects) + "</svg>"
+    )
+
+
+class ProfilingMiddleware:
+    """ASGI middleware that profiles the requests RequestProfiler.wants().
+
+    The profile id is returned in X-Profile-Id (the client's X-Request-Id
+    plus a random suffix when given). Results are written after the
+    response has been sent.
+    """
+
+    def __init__(self, app, profiler: RequestProfiler):
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        headers = dict(scope["headers"])
+        reason = self.profiler.wants(headers)
+        if reason is None or scope["path"].startswith("/profiles"):
+            return await self.app(scope, receive, send)
+        # Sanitize before falling back, and always add a generated suffix so a
+        # client-chosen id can't name an empty file or replace another profile
+        clean = "".join(c for c in headers.get(REQUEST_ID_HEADER, b"").decode("latin-1")
+                        if c.isascii() and (c.isalnum() or c in "-_"))[:48]
+        request_id = f"{clean}-{uuid.uuid4().hex[:8]}" if clean else uuid.uuid4().hex[:16]
+        profile = self.profiler.begin(request_id, scope["method"], scope["path"], reason)
+        if profile is None:
+            return await self.app(scope, receive, send)
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                profile.status = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [(b"x-profile-id", request_id.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            await asyncio.to_thread(self.profiler.end, profile)
+
+
+# global instance
+profiler = RequestProfiler()
@@ -0,0 +1,164 @@
+# rollups.py
+
+import bisect
+import logging
+import threading
+from collections import Counter
+from datetime import date, datetime, timedelta
+from typing import Dict, List
+
+from backend.tools.event_archive import event_archive, SOURCE_CODES
+from backend.tools.context_switch import activity_key, is_switch, TIME_FORMAT
+
+# Rough handling time per email, used to turn counts into communication hours
+EMAIL_MINUTES = {"sent": 5, "received": 2}
+
+
+def _counters(source: str, event: Dict) -> Dict[str, int]:
+    if source == "github":
+        if event["action"] != "commit":
+            return {"github_actions": 1}
+        return {"github_actions": 1, "commits": 1, "lines_changed": event.get("lines_changed") or 0}
+    if source == "calendar":
+        if event["event_type"] == "focus_block":
+            return {"focus_minutes": event["duration_minutes"]}
+        return {"meeting_minutes": event["duration_minutes"], "meetings": 1}
+    direction = "sent" if event["is_sent"] else "received"
+    return {f"emails_{direction}": 1, f"emails_{direction}_{event['priority']}": 1}
+
+
+class DailyRollups:
+    """Per-user, per-day counters maintained incrementally on ingest.
+
+    Context switches follow context_switch.is_switch (same gap thresholds as
+    detect_switches) and are kept exact under out-of-order arrival: each day
+    holds its (time, activity) sequence sorted, and an insertion only
+    re-scores the pairs it touches. Trigger pairs are counted the same way.
+    """
+
+    def __init__(self):
+        self.days = {}       # user_id -> "YYYY-MM-DD" -> Counter
+        self._sequence = {}  # user_id -> "YYYY-MM-DD" -> sorted [(timestamp, key)]
+        self._triggers = {}  # user_id -> "YYYY-MM-DD" -> Counter of (from, to)
+        self._lock = threading.Lock()
+
+    def _day(self, user_id: str, day: str) -> Counter:
+        return self.days.setdefault(user_id, {}).setdefault(day, Counter())
+
+    def _add_switch_point(self, user_id: str, day: str, timestamp: str, key: str) -> int:
+        seq = self._sequence.setdefault(user_id, {}).setdefault(day, [])
+        triggers = self._triggers.setdefault(user_id, {}).setdefault(day, Counter())
+        i = bisect.bisect_right(seq, (timestamp, key))
+        before = seq[i - 1] if i > 0 else None
+        after = seq[i] if i < len(seq) else None
+        seq.insert(i, (timestamp, key))
+        # The new point splits (before, after) into (before, new) + (new, after)
+        delta = 0
+        for pair, sign in (((before, (timestamp, key)), 1), (((timestamp, key), after), 1),
+                           ((before, after), -1)):
+            a, b = pair
+            if a is None or b is None:
+                continue
+            if is_switch(datetime.strptime(a[0], TIME_FORMAT), a[1],
+                         datetime.strptime(b[0], TIME_FORMAT), b[1]):
+                delta += sign
+                triggers[(a[1], b[1])] += sign
+        return delta
+
+    def ingest_events(self, user_id: str, source: str, events: List[Dict]):
+        """Fold newly seen fetcher records into their day's counters."""
+        field = "start" if source == "calendar" else "timestamp"
+        with self._lock:
+            for event in events:
+                timestamp = event[field]
+                day = timestamp[:10]
+                counters = self._day(user_id, day)
+                counters.update(_counters(source, event))
+                counters["switches"] += self._add_switch_point(
+                    user_id, day, timestamp, activity_key(source, event)
+                )
+
+    def ingest_voice_log(self, user_id: str, result: Dict):
+        """Count mood, energy and activity tags of a processed voice log."""
+        day = result.get("timestamp", datetime.now().isoformat())[:10]
+        with self._lock:
+            counters = self._day(user_id, day)
+            counters["voice_logs"] += 1
+            counters[f"mood_{result.get('mood', 'other')}"] += 1
+            counters[f"energy_{result.get('energy_level', 'unknown')}"] += 1
+            counters[f"activity_{result.get('activity_type', 'other')}"] += 1
+
+    def get_range(self, user_id: str, days: int = 7) -> List[Dict]:
+        """The last `days` days of counters, oldest first - O(days)."""
+        today = date.today()
+        user_days = self.days.get(user_id, {})
+        out = []
+        for i in range(days - 1, -1, -1):
+            day = (today - timedelta(days=i)).isoformat()
+            out.append({"date": day, **user_days.get(day, Counter())})
+        return out
+
+    def top_switch_triggers(self, user_id: str, days: int = 7, top_n: int = 5) -> List[Dict]:
+        """Most frequent switch pairs over the last `days` days."""
+        today = date.today()
+        user_triggers = self._triggers.get(user_id, {})
+        total = Counter()
+        for i in range(days):
+            total.update(user_triggers.get((today - timedelta(days=i)).isoformat(), Counter()))
+        return [{"from": a, "to": b, "count": n} for (a, b), n in total.most_common(top_n) if n > 0]
+
+    def backfill(self, user_id: str, days: int = 365, voice_logs: List[Dict] = ()) -> int:
+        """Rebuild a user's rollups from the event archive and stored voice logs."""
+        end = date.today() + timedelta(days=1)
+        cols = event_archive.scan(
+            user_id, end - timedelta(days=days), end,
+            columns=("ts", "source", "action", "repo", "priority", "duration_minutes",
+                     "lines_changed", "is_sent"),
+        )
+        decoded = {c: event_archive.decode(user_id, c, cols[c]) for c in ("action", "repo", "priority")}
+        stamps = cols["ts"].astype("datetime64[s]").astype(str)
+        sources = {code: name for name, code in SOURCE_CODES.items()}
+        grouped = {s: [] for s in sources.values()}
+        for i, source in enumerate(cols["source"].tolist()):
+            timestamp = stamps[i].replace("T", " ")
+            source = sources[source]
+            action = decoded["action"][i]
+            grouped[source].append({
+                "timestamp": timestamp,
+                "start": timestamp,
+                "action": action,
+                "event_type": action,
+                "repo": decoded["repo"][i],
+                "priority": decoded["priority"][i],
+                "duration_minutes": int(cols["duration_minutes"][i]),
+                "lines_changed": int(cols["lines_changed"][i]),
+                "is_sent": bool(cols["is_sent"][i]),
+            })
+
+        with self._lock:
+            self.days.pop(user_id, None)
+            self._sequence.pop(user_id, None)
+            self._triggers.pop(user_id, None)
+        for source, events in grouped.items():
+            self.ingest_events(user_id, source, events)
+        for doc in voice_logs:
+            self.ingest_voice_log(user_id, {**doc["content"], "timestamp": doc["timestamp"]})
+        return len(stamps)
+
+    def rebuild(self, user_ids: List[str] = (), voice_logs=lambda user_id: (),
+                days: int = 365) -> Dict[str, int]:
+        """Backfill every archived user plus `user_ids` (e.g. voice-log only
+        users). Rollups live in memory, so this runs at startup before any
+        sync can ingest on top of them."""
+        rebuilt = {}
+        for user_id in sorted(set(event_archive.users()) | set(user_ids)):
+            try:
+                rebuilt[user_id] = self.backfill(user_id, days=days, voice_logs=voice_logs(user_id))
+            except ValueError as e:
+                logging.warning("Skipping rollup rebuild: %s", e)
+        return rebuilt
+
+
+# global instance
+rollups = DailyRollups()
+
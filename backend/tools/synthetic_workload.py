@@ -0,0 +1,208 @@
+# synthetic_workload.py
+
+import hashlib
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Iterator, List
+
+import numpy as np
+
+from backend.tools.github import REPOS, ACTIONS, COMMIT_MESSAGES
+from backend.tools.google_calendar import MEETING_TYPES, FOCUS_BLOCKS
+from backend.tools.gmail import SUBJECTS
+
+DAY_NAMES = np.array(["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"])
+SOURCES = ("github", "calendar", "email")
+
+# Mean events per day, matching the weekly volumes of the live fetchers
+GITHUB_PER_DAY = 20 / 7
+MEETINGS_PER_DAY = 15 / 7
+FOCUS_PER_DAY = 10 / 7
+EMAILS_PER_DAY = 27.5 / 7
+
+DEFAULT_CHUNK_SIZE = 100_000
+
+
+def _rng(user_id: str, source: str, seed: int) -> np.random.Generator:
+    """Deterministic generator per (user, source, seed) - Python's hash() is
+    salted per process, so derive the entropy from sha256 instead."""
+    digest = hashlib.sha256(f"{seed}:{user_id}:{source}".encode()).digest()
+    return np.random.default_rng(int.from_bytes(digest[:8], "little"))
+
+
+def _midnight(start: datetime) -> int:
+    """Naive midnight of start as epoch seconds (kept naive like the fetchers)."""
+    return int(np.datetime64(start.date(), "s").astype(np.int64))
+
+
+def _format(epoch: np.ndarray) -> np.ndarray:
+    """Epoch seconds -> "%Y-%m-%d %H:%M:%S" strings, vectorized."""
+    iso = np.datetime_as_string(epoch.astype("datetime64[s]"), unit="s")
+    return np.char.replace(iso, "T", " ")
+
+
+def _day_of_week(epoch: np.ndarray) -> np.ndarray:
+    # 1970-01-01 was a Thursday
+    return DAY_NAMES[(epoch // 86400 + 3) % 7]
+
+
+def _day_windows(rng: np.random.Generator, days: int, per_day: float, chunk_size: int):
+    """Draw per-day event counts and split the day range into windows of
+    roughly chunk_size events."""
+    counts = rng.poisson(per_day, days)
+    days_per_chunk = max(1, int(chunk_size / max(per_day, 1e-9)))
+    for d0 in range(0, days, days_per_chunk):
+        d1 = min(days, d0 + days_per_chunk)
+        yield d0, np.repeat(np.arange(d0, d1), counts[d0:d1])
+
+
+def _to_records(columns: Dict[str, np.ndarray]) -> List[Dict]:
+    keys = list(columns)
+    values = [columns[k].tolist() for k in keys]
+    return [dict(zip(keys, row)) for row in zip(*values)]
+
+
+def github_columns(user_id: str, start: datetime, days: int, seed: int = 0,
+                   per_day: float = GITHUB_PER_DAY,
+                   chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[Dict[str, np.ndarray]]:
+    """Yield github.fetch_activity-shaped columns in time order."""
+    rng = _rng(user_id, "github", seed)
+    base = _midnight(start)
+    weights = np.array([a["weight"] for a in ACTIONS], dtype=float)
+    action_names = np.array([a["type"] for a in ACTIONS])
+    repos = np.array(REPOS)
+    messages = np.array(COMMIT_MESSAGES, dtype=object)
+
+    for _, day_idx in _day_windows(rng, days, per_day, chunk_size):
+        n = len(day_idx)
+        epoch = (base + day_idx * 86400
+                 + rng.integers(9, 19, n) * 3600 + rng.integers(0, 60, n) * 60)
+        epoch.sort()
+        action = action_names[rng.choice(len(ACTIONS), n, p=weights / weights.sum())]
+        is_commit = action == "commit"
+        lines = rng.integers(5, 201, n).astype(object)
+        files = rng.integers(1, 9, n).astype(object)
+        msgs = messages[rng.integers(0, len(COMMIT_MESSAGES), n)]
+        lines[~is_commit] = None
+        files[~is_commit] = None
+        msgs[~is_commit] = None
+        yield {
+            "repo": repos[rng.integers(0, len(REPOS), n)],
+            "action": action,
+            "timestamp": _format(epoch),
+            "day_of_week": _day_of_week(epoch),
+            "lines_changed": lines,
+            "files_modified": files,
+            "commit_message": msgs,
+        }
+
+
+def calendar_columns(user_id: str, start: datetime, days: int, seed: int = 0,
+                     meetings_per_day: float = MEETINGS_PER_DAY,
+                     focus_per_day: float = FOCUS_PER_DAY,
+                     chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[Dict[str, np.ndarray]]:
+    """Yield google_calendar.fetch_events-shaped columns in start order."""
+    rng = _rng(user_id, "calendar", seed)
+    base = _midnight(start)
+    summaries = np.array([m["summary"] for m in MEETING_TYPES] + FOCUS_BLOCKS)
+    meeting_minutes = np.array([m["duration"] for m in MEETING_TYPES])
+    attendees = np.array([m["attendees"] for m in MEETING_TYPES])
+    recurring = np.array([m["frequency"] in ["daily", "weekly", "biweekly"] for m in MEETING_TYPES])
+    n_types = len(MEETING_TYPES)
+
+    for _, day_idx in _day_windows(rng, days, meetings_per_day + focus_per_day, chunk_size):
+        n = len(day_idx)
+        is_focus = rng.random(n) < focus_per_day / (meetings_per_day + focus_per_day)
+        kind = rng.integers(0, n_types, n)
+        focus_kind = rng.integers(0, len(FOCUS_BLOCKS), n)
+        minutes = np.where(is_focus, 0, rng.choice([0, 15, 30, 45], n))
+        duration = np.where(is_focus, rng.choice([60, 90, 120, 180], n), meeting_minutes[kind])
+        begin = base + day_idx * 86400 + rng.integers(9, 18, n) * 3600 + minutes * 60
+        order = np.argsort(begin, kind="stable")
+        # Booked or last edited 1h-14d ahead of the start
+        updated = begin - rng.integers(1, 14 * 24 + 1, n) * 3600
+        begin, duration, is_focus, kind, focus_kind, updated = (
+            begin[order], duration[order], is_focus[order], kind[order], focus_kind[order], updated[order]
+        )
+        yield {
+            "summary": np.where(is_focus, summaries[n_types + focus_kind], summaries[kind]),
+            "start": _format(begin),
+            "end": _format(begin + duration * 60),
+            "duration_minutes": duration,
+            "attendees_count": np.where(is_focus, 1, attendees[kind]),
+            "event_type": np.where(is_focus, "focus_block", "meeting"),
+            "day_of_week": _day_of_week(begin),
+            "is_recurring": np.where(is_focus, False, recurring[kind]),
+            "updated": _format(updated),
+        }
+
+
+def email_columns(user_id: str, start: datetime, days: int, seed: int = 0,
+                  per_day: float = EMAILS_PER_DAY,
+                  chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[Dict[str, np.ndarray]]:
+    """Yield gmail.fetch_email_metadata-shaped columns in time order
+    (oldest first, so chunks can be streamed)."""
+    rng = _rng(user_id, "email", seed)
+    base = _midnight(start)
+    subjects = np.array([s["subject"] for s in SUBJECTS])
+    categories = np.array([s["category"] for s in SUBJECTS])
+    priorities = np.array([s["priority"] for s in SUBJECTS])
+
+    for _, day_idx in _day_windows(rng, days, per_day, chunk_size):
+        n = len(day_idx)
+        epoch = (base + day_idx * 86400
+                 + rng.integers(8, 20, n) * 3600 + rng.integers(0, 60, n) * 60)
+        epoch.sort()
+        kind = rng.integers(0, len(SUBJECTS), n)
+        category = categories[kind]
+        yield {
+            "subject": subjects[kind],
+            "timestamp": _format(epoch),
+            "day_of_week": _day_of_week(epoch),
+            "category": category,
+            "priority": priorities[kind],
+            "is_sent": rng.random(n) < 0.5,
+            "thread_count": rng.integers(1, 6, n),
+            "has_attachments": (rng.random(n) < 0.5) & (category == "work"),
+        }
+
+
+GENERATORS = {
+    "github": github_columns,
+    "calendar": calendar_columns,
+    "email": email_columns,
+}
+
+
+def generate_workload(user_ids: Iterable[str], start: datetime, days: int, seed: int = 0,
+                      sources: Iterable[str] = SOURCES, records: bool = True,
+                      chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[Dict]:
+    """Stream synthetic events for many users.
+
+    Yields {"user_id", "source", "events"} chunks; events are record dicts in
+    the fetchers' schema, or the raw column arrays when records=False (much
+    cheaper for bulk loading). Output is identical for the same
+    (user_id, seed, start, days) regardless of what else is generated.
+    """
+    for user_id in user_ids:
+        for source in sources:
+            for columns in GENERATORS[source](user_id, start, days, seed=seed, chunk_size=chunk_size):
+                yield {
+                    "user_id": user_id,
+                    "source": source,
+                    "events": _to_records(columns) if records else columns,
+                }
+
+
+if __name__ == "__main__":
+    # Rough throughput check: 1,000 users x 6 months
+    start = datetime.now() - timedelta(days=180)
+    users = [f"user_{i:04d}" for i in range(1000)]
+    for records in (False, True):
+        t0 = time.perf_counter()
+        total = 0
+        for chunk in generate_workload(users, start, 180, records=records):
+            total += len(chunk["events"]) if records else len(next(iter(chunk["events"].values())))
+        elapsed = time.perf_counter() - t0
+        label = "records" if records else "columns"
+        print(f"{label}: {total:,} events in {elapsed:.2f}s ({total / elapsed:,.0f} events/s)")
@@ -0,0 +1,172 @@
+# team_analytics.py
+
+import json
+from collections import Counter
+from typing import Dict, List
+
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import connected_components
+from sklearn.feature_extraction.text import CountVectorizer
+from sklearn.preprocessing import normalize
+
+TAG_FIELDS = ("mood", "energy_level", "activity_type")
+MATCH_MIN_SIMILARITY = 0.1
+# Users whose centroids are at least this similar land in one cluster
+CLUSTER_MIN_SIMILARITY = 0.5
+# Free-text fields of stored summaries; everything else (timestamps, file
+# names, scores, tags) is metadata and stays out of the team matrix
+CONTENT_FIELDS = ("transcription", "llm_summary", "insight_summary", "raw_input", "insights")
+
+
+def content_text(content: Dict) -> str:
+    """The free text of a stored summary, without field names or metadata."""
+    parts = []
+    for field in CONTENT_FIELDS:
+        value = content.get(field)
+        if isinstance(value, (list, dict)):
+            parts.append(json.dumps(value))
+        elif value not in (None, ""):
+            parts.append(str(value))
+    return " ".join(parts)
+
+
+def stack(parts: List[Dict]) -> Dict:
+    """Stack per-user TF-IDF slices into one CSR matrix over a shared vocabulary.
+
+    Each part is {"terms", "matrix", "users", "tags"} where terms are the
+    part's columns in order and tags are its voice-log tags (not row-aligned).
+    Columns are remapped to the union vocabulary by index arithmetic only;
+    nothing is re-tokenized. Rows stay grouped by user in input order.
+    """
+    vocabulary = {}
+    data, indices, indptr, users, tags = [], [], [np.zeros(1, dtype=np.int64)], [], []
+    offset = 0
+    for p in parts:
+        remap = np.array([vocabulary.setdefault(t, len(vocabulary)) for t in p["terms"]], dtype=np.int32)
+        m = p["matrix"]
+        data.append(np.asarray(m.data))
+        indices.append(remap[m.indices])
+        indptr.append(np.asarray(m.indptr[1:], dtype=np.int64) + offset)
+        offset += m.nnz
+        users.extend(p["users"])
+        tags.extend(p["tags"])
+    matrix = csr_matrix(
+        (np.concatenate(data) if data else np.empty(0),
+         np.concatenate(indices) if indices else np.empty(0, dtype=np.int32),
+         np.concatenate(indptr)),
+        shape=(len(users), len(vocabulary)),
+    )
+    terms = sorted(vocabulary, key=vocabulary.get)
+    return {"terms": terms, "matrix": matrix, "users": users, "tags": tags}
+
+
+def _user_groups(users: List[str]):
+    """Distinct users and the (users x rows) averaging matrix for grouped rows."""
+    names, owner = np.unique(np.array(users, dtype=object), return_inverse=True)
+    counts = np.bincount(owner, minlength=len(names))
+    assign = csr_matrix(
+        (1.0 / counts[owner], (owner, np.arange(len(users)))), shape=(len(names), len(users))
+    )
+    return list(names), owner, assign
+
+
+def themes(team: Dict, top_n: int = 10) -> List[Dict]:
+    """Terms carrying the most TF-IDF weight across the team, and how many
+    users mention each."""
+    matrix = team["matrix"]
+    if not matrix.nnz:
+        return []
+    weight = np.asarray(matrix.sum(axis=0)).ravel()
+    _, _, assign = _user_groups(team["users"])
+    users_with_term = np.asarray((assign @ matrix > 0).sum(axis=0)).ravel()
+    top = weight.argsort()[::-1][:top_n]
+    return [
+        {"term": team["terms"][i], "weight": round(float(weight[i]), 3), "users": int(users_with_term[i])}
+        for i in top if weight[i] > 0
+    ]
+
+
+def match(team: Dict, queries: List[str], top_n: int = 10) -> Dict[str, List[Dict]]:
+    """Rank users against every query with one sparse multiply.
+
+    A user's score is their best-matching document's cosine similarity.
+    """
+    matrix = team["matrix"]
+    if not queries or not matrix.nnz:
+        return {q: [] for q in queries}
+    vocabulary = {t: i for i, t in enumerate(team["terms"])}
+    q = normalize(CountVectorizer(vocabulary=vocabulary).transform(queries).astype(np.float64))
+    scores = (q @ matrix.T).toarray()  # queries x documents
+    names, owner, _ = _user_groups(team["users"])
+    # Per-user max: scatter each document score onto its owner
+    best = np.zeros((len(queries), len(names)))
+    hits = np.zeros((len(queries), len(names)), dtype=np.int64)
+    for qi in range(len(queries)):
+        np.maximum.at(best[qi], owner, scores[qi])
+        np.add.at(hits[qi], owner, scores[qi] > MATCH_MIN_SIMILARITY)
+    results = {}
+    for qi, query in enumerate(queries):
+        order = best[qi].argsort()[::-1][:top_n]
+        results[query] = [
+            {"user_id": names[u], "score": round(float(best[qi, u]), 3), "matching_documents": int(hits[qi, u])}
+            for u in order if best[qi, u] > MATCH_MIN_SIMILARITY
+        ]
+    return results
+
+
+def cluster(team: Dict, min_similarity: float = CLUSTER_MIN_SIMILARITY, top_terms: int = 5) -> List[Dict]:
+    """Group users with similar documents.
+
+    Each user's centroid is a row of (averaging matrix @ documents); one
+    centroid-by-centroid multiply gives every pairwise similarity, and
+    connected components over the pairs above the threshold are the clusters.
+    """
+    matrix = team["matrix"]
+    if not matrix.nnz:
+        return []
+    names, _, assign = _user_groups(team["users"])
+    centroids = normalize(assign @ matrix)
+    similarity = centroids @ centroids.T
+    similarity.data[similarity.data < min_similarity] = 0
+    similarity.eliminate_zeros()
+    n, labels = connected_components(similarity, directed=False)
+    members = csr_matrix((np.ones(len(names)), (labels, np.arange(len(names)))), shape=(n, len(names)))
+    weight = (members @ centroids).toarray()
+    clusters = []
+    for c in range(n):
+        users = [names[u] for u in np.flatnonzero(labels == c)]
+        clusters.append({
+            "users": users,
+            "size": len(users),
+            "top_terms": [team["terms"][i] for i in weight[c].argsort()[::-1][:top_terms] if weight[c, i] > 0],
+        })
+    return sorted(clusters, key=lambda c: -c["size"])
+
+
+def tag_counts(team: Dict) -> Dict[str, Dict[str, int]]:
+    """Counts of each voice-log tag value across the team."""
+    counts = {field: Counter() for field in TAG_FIELDS}
+    for tags in team["tags"]:
+        for field in TAG_FIELDS:
+            value = tags.get(field)
+            if value not in (None, ""):
+                counts[field][str(value).lower()] += 1
+    return {field: dict(c.most_common()) for field, c in counts.items()}
+
+
+def team_report(store, user_ids: List[str], queries: List[str] = (), days: int = 7,
+                summary_type: str = None, top_n: int = 10,
+                min_similarity: float = CLUSTER_MIN_SIMILARITY) -> Dict:
+    """Themes, query matches, clusters and voice-log tags for a team's
+    documents from the last `days` days (only `summary_type` ones if given)."""
+    team = store.team_slice(user_ids, days=days, summary_type=summary_type)
+    return {
+        "users_requested": len(user_ids),
+        "users_with_data": len(set(team["users"])),
+        "documents": len(team["users"]),
+        "themes": themes(team, top_n),
+        "matches": match(team, list(queries), top_n),
+        "clusters": cluster(team, min_similarity),
+        "voice_log_tags": tag_counts(team),
+    }
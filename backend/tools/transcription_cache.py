@@ -0,0 +1,77 @@
+# transcription_cache.py
+
+import hashlib
+import json
+import os
+import threading
+from typing import Dict, Optional
+
+CACHE_DIR = os.getenv("TRANSCRIPTION_CACHE_DIR", os.path.join(".cache", "transcriptions"))
+CACHE_MAX_BYTES = int(os.getenv("TRANSCRIPTION_CACHE_MAX_BYTES", 50 * 1024 * 1024))
+CHUNK_SIZE = 1024 * 1024
+
+
+class TranscriptionCache:
+    """Content-addressed, disk-bounded cache for voice-log results.
+
+    Entries are JSON files named by the sha256 of the audio bytes plus the
+    transcription parameters. File mtime is used as the LRU clock: hits touch
+    the entry, and the oldest entries are evicted once the directory grows
+    past max_bytes.
+    """
+
+    def __init__(self, cache_dir: str = CACHE_DIR, max_bytes: int = CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def new_hasher(**params):
+        """Start a hash seeded with the transcription parameters, so a model or
+        beam-size change never returns a stale entry."""
+        h = hashlib.sha256()
+        h.update(json.dumps(params, sort_keys=True).encode())
+        return h
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key: str) -> Optional[Dict]:
+        path = self._path(key)
+        with self._lock:
+            try:
+                with open(path) as f:
+                    entry = json.load(f)
+                os.utime(path)
+                return entry
+            except (FileNotFoundError, json.JSONDecodeError):
+                return None
+
+    def put(self, key: str, value: Dict):
+        path = self._path(key)
+        tmp = path + ".tmp"
+        with self._lock:
+            with open(tmp, "w") as f:
+                json.dump(value, f)
+            os.replace(tmp, path)
+            self._evict()
+
+    def _evict(self):
+        entries = []
+        total = 0
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".json"):
+                continue
+            st = os.stat(os.path.join(self.cache_dir, name))
+            entries.append((st.st_mtime, st.st_size, name))
+            total += st.st_size
+        entries.sort()
+        while total > self.max_bytes and entries:
+            _, size, name = entries.pop(0)
+            os.remove(os.path.join(self.cache_dir, name))
+            total -= size
+
+
+# global instance
+transcription_cache = TranscriptionCache()
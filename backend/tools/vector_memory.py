@@ -1,20 +1,88 @@
 # vector_memory.py
 
 import json
-from datetime import datetime
-from typing import Dict
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+import numpy as np
+from scipy.sparse import csr_matrix
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
+from backend.tools.embeddings import embedder as default_embedder
+from backend.tools import memory_snapshot, team_analytics
+from backend.tools.versions import versions
+
+KEYWORD_MIN_SIMILARITY = 0.1
+SEMANTIC_MIN_SIMILARITY = 0.35
+# Weight of the keyword score in the hybrid rerank; the rest is semantic
+HYBRID_ALPHA = 0.3
+# Candidates taken from each retriever before reranking, per result wanted
+CANDIDATES_PER_RESULT = 4
 
 class VectorMemoryStore:
-    def __init__(self):
+    def __init__(self, embedder=default_embedder):
         self.memory_store = {}
-        self.vectorizer = TfidfVectorizer(max_features=1000, stop_words='english')
+        self.vectorizers = {}
         self.document_vectors = {}
         self.documents = {}
+        self.embedder = embedder
+        self.embeddings = {}  # user_id -> (n_docs, dim) float32, rows aligned with memory_store
+        # Guards writes against capture(); matrices and embeddings are always
+        # replaced, never mutated, so captured references stay consistent
+        self._lock = threading.RLock()
     
-    def store_summary(self, user_id: str, summary: Dict, summary_type: str = "weekly"):
+    def store_summary(self, user_id: str, summary: Dict, summary_type: str = "weekly") -> List[Dict]:
         """Store a structured summary dict with TF-IDF indexing."""
+        with self._lock:
+            doc = self._append_document(user_id, summary, summary_type)
+            self._embed_documents(user_id, [doc])
+            self._update_vectors(user_id)
+        return self._notify(user_id, [doc])
+    
+    def store_summaries(self, user_id: str, summaries: List[Dict], summary_type: str = "weekly") -> List[Dict]:
+        """Store many summaries with a single TF-IDF refit and one embedding batch."""
+        with self._lock:
+            docs = [self._append_document(user_id, summary, summary_type) for summary in summaries]
+            self._embed_documents(user_id, docs)
+            self._update_vectors(user_id)
+        return self._notify(user_id, docs)
+    
+    @staticmethod
+    def view_item(doc: Dict) -> Dict:
+        """A document as the /memory view lists it."""
+        content = doc["content"]
+        return {
+            "timestamp": doc["timestamp"],
+            "type": doc["type"],
+            "llm_summary": content.get("llm_summary"),
+            "raw_input": content.get("raw_input"),
+        }
+    
+    def _notify(self, user_id: str, docs: List[Dict]) -> List[Dict]:
+        """Bump the user's memory version; returns the new items as listed."""
+        items = [self.view_item(d) for d in docs]
+        versions.bump(user_id, "memory", {"items": items})
+        return items
+    
+    def _embed_documents(self, user_id: str, docs: List[Dict]):
+        """Embed new documents in one batch and cache the vectors with them."""
+        if self.embedder is None:
+            return
+        vectors = self.embedder.embed([d["text_representation"] for d in docs])
+        if vectors is None:
+            return
+        for doc, vec in zip(docs, vectors):
+            doc["embedding"] = vec
+        # Rebuild the aligned matrix; documents stored before the model was
+        # available get a zero row and simply never match semantically
+        dim = vectors.shape[1]
+        self.embeddings[user_id] = np.vstack([
+            d.get("embedding", np.zeros(dim, dtype=np.float32)) for d in self.memory_store[user_id]
+        ])
+    
+    def _append_document(self, user_id: str, summary: Dict, summary_type: str) -> Dict:
         if user_id not in self.memory_store:
             self.memory_store[user_id] = []
         
@@ -29,8 +97,7 @@ class VectorMemoryStore:
         
         self.memory_store[user_id].append(document)
         self.documents[document["id"]] = document
-        
-        self._update_vectors(user_id)
+        return document
     
     def _create_text_representation(self, summary: Dict) -> str:
         parts = []
@@ -47,26 +114,81 @@ class VectorMemoryStore:
             return
         texts = [d["text_representation"] for d in docs]
         try:
-            self.document_vectors[user_id] = self.vectorizer.fit_transform(texts)
+            # One vectorizer per user: refitting a shared one would change the
+            # vocabulary under every other user's stored vectors
+            vectorizer = self._new_vectorizer()
+            self.document_vectors[user_id] = vectorizer.fit_transform(texts)
+            self.vectorizers[user_id] = vectorizer
         except ValueError:
             # all docs too similar
             pass
     
-    def query_memory(self, user_id: str, query: str = None, limit: int = 5) -> str:
-        if user_id not in self.memory_store:
-            return "No previous data found."
-        
-        docs = self.memory_store[user_id]
-        if query and user_id in self.document_vectors:
-            try:
-                qv = self.vectorizer.transform([query])
-                sims = cosine_similarity(qv, self.document_vectors[user_id])[0]
-                idx = sims.argsort()[-limit:][::-1]
-                docs = [docs[i] for i in idx if sims[i] > 0.1]
-            except:
-                docs = docs[-limit:]
-        else:
-            docs = docs[-limit:]
+    @staticmethod
+    def _new_vectorizer() -> TfidfVectorizer:
+        return TfidfVectorizer(max_features=1000, stop_words='english')
+    
+    @staticmethod
+    def _keyword_scores(vectorizer, matrix, query: str) -> Optional[np.ndarray]:
+        if vectorizer is None or matrix is None:
+            return None
+        try:
+            return cosine_similarity(vectorizer.transform([query]), matrix)[0]
+        except Exception:
+            return None
+    
+    def _semantic_scores(self, matrix: Optional[np.ndarray], query: str) -> Optional[np.ndarray]:
+        if self.embedder is None or matrix is None:
+            return None
+        qv = self.embedder.embed([query])
+        return None if qv is None else matrix @ qv[0]
+    
+    def _rank(self, user_id: str, query: str, limit: int, mode: str) -> Optional[List[Dict]]:
+        """Hybrid retrieval: union the keyword and embedding candidates, then
+        rerank by a weighted score. Keyword-only when no embeddings exist."""
+        # Writers replace these together under the lock; take one consistent
+        # view and score outside it
+        with self._lock:
+            docs = list(self.memory_store[user_id])
+            vectorizer = self.vectorizers.get(user_id)
+            matrix = self.document_vectors.get(user_id)
+            embeddings = self.embeddings.get(user_id)
+        if embeddings is not None and len(embeddings) != len(docs):
+            embeddings = None
+        kw = self._keyword_scores(vectorizer, matrix, query)
+        sem = self._semantic_scores(embeddings, query) if mode == "hybrid" else None
+        if kw is None and sem is None:
+            return None
+        if sem is None:
+            idx = kw.argsort()[-limit:][::-1]
+            return [docs[i] for i in idx if kw[i] > KEYWORD_MIN_SIMILARITY]
+        if kw is None:
+            kw = np.zeros(len(docs))
+        # TF-IDF rows trail the documents after a failed refit; only score
+        # the rows both arrays cover
+        n = min(len(kw), len(sem))
+        kw, sem = kw[:n], sem[:n]
+        k = limit * CANDIDATES_PER_RESULT
+        candidates = set(kw.argsort()[-k:]) | set(sem.argsort()[-k:])
+        candidates = [
+            i for i in candidates
+            if kw[i] > KEYWORD_MIN_SIMILARITY or sem[i] > SEMANTIC_MIN_SIMILARITY
+        ]
+        score = HYBRID_ALPHA * kw + (1 - HYBRID_ALPHA) * sem
+        candidates.sort(key=lambda i: score[i], reverse=True)
+        return [docs[i] for i in candidates[:limit]]
+    
+    def query_memory(self, user_id: str, query: str = None, limit: int = 5, mode: str = "hybrid") -> str:
+        """Recent memories, or the best matches for `query`.
+
+        mode="hybrid" blends TF-IDF with local embeddings when the ONNX model
+        is available; mode="keyword" forces TF-IDF only.
+        """
+        with self._lock:
+            if user_id not in self.memory_store:
+                return "No previous data found."
+            docs = list(self.memory_store[user_id])
+        ranked = self._rank(user_id, query, limit, mode) if query else None
+        docs = ranked if ranked is not None else docs[-limit:]
         
         lines = []
         for d in docs:
@@ -74,6 +196,131 @@ class VectorMemoryStore:
             lines.append(f"[{d['timestamp'][:10]}] {d['type']}: {summary[:200]}...")
         return "\n".join(lines)
     
+    def get_documents(self, user_id: str, limit: int = None) -> List[Dict]:
+        """A user's stored documents, oldest first (the last `limit` if given)."""
+        docs = self.memory_store.get(user_id, [])
+        return docs[-limit:] if limit else list(docs)
+    
+    def team_slice(self, user_ids: List[str], days: int = 7, summary_type: str = None) -> Dict:
+        """Recent documents of several users as TF-IDF rows of their free
+        text (team_analytics.content_text), stacked into one sparse matrix
+        over their shared vocabulary (see team_analytics.stack)."""
+        cutoff = (datetime.now() - timedelta(days=days)).isoformat()
+        with self._lock:
+            state = [
+                (u, self.memory_store[u], self.vectorizers.get(u), self.document_vectors.get(u))
+                for u in user_ids if u in self.memory_store
+            ]
+        parts = []
+        for user_id, docs, vectorizer, matrix in state:
+            recent = [
+                i for i, d in enumerate(docs)
+                if d["timestamp"] >= cutoff and (summary_type is None or d["type"] == summary_type)
+            ]
+            if recent and (matrix is None or recent[-1] >= matrix.shape[0]):
+                # Users with a single document have no stored vectorizer (and
+                # its vocabulary trails the documents after a failed refit)
+                try:
+                    vectorizer = self._new_vectorizer()
+                    vectorizer.fit([team_analytics.content_text(d["content"]) for d in docs])
+                except ValueError:
+                    vectorizer = None
+            rows = recent if vectorizer is not None else []
+            # Rows are the transcription/summary text only, weighted by the
+            # user's fitted IDF: timestamps, file names, scores and field
+            # names never reach the team matrix
+            block = (
+                vectorizer.transform([team_analytics.content_text(docs[i]["content"]) for i in rows])
+                if rows else csr_matrix((0, 0))
+            )
+            parts.append({
+                "terms": sorted(vectorizer.vocabulary_, key=vectorizer.vocabulary_.get) if rows else [],
+                "matrix": block,
+                "users": [user_id] * len(rows),
+                "tags": [
+                    {f: docs[i]["content"].get(f) for f in team_analytics.TAG_FIELDS}
+                    for i in recent if docs[i]["type"] == "voice_log"
+                ],
+            })
+        return team_analytics.stack(parts)
+    
+    def user_ids(self) -> List[str]:
+        return list(self.memory_store)
+    
+    def export_user(self, user_id: str) -> List[Dict]:
+        """Remove and return a user's documents, e.g. to move them to another shard."""
+        with self._lock:
+            docs = self.memory_store.pop(user_id, [])
+            for d in docs:
+                self.documents.pop(d["id"], None)
+            self.vectorizers.pop(user_id, None)
+            self.document_vectors.pop(user_id, None)
+            self.embeddings.pop(user_id, None)
+        return docs
+    
+    def import_user(self, user_id: str, docs: List[Dict]):
+        """Adopt exported documents, reusing their cached embeddings."""
+        with self._lock:
+            self.memory_store.setdefault(user_id, []).extend(docs)
+            for d in docs:
+                self.documents[d["id"]] = d
+            embedded = [d.get("embedding") for d in self.memory_store[user_id]]
+            if any(e is not None for e in embedded):
+                dim = next(len(e) for e in embedded if e is not None)
+                self.embeddings[user_id] = np.vstack([
+                    e if e is not None else np.zeros(dim, dtype=np.float32) for e in embedded
+                ])
+            self._update_vectors(user_id)
+        versions.bump(user_id, "memory")
+    
+    def capture(self) -> Dict[str, tuple]:
+        """Point-in-time references to every user's state, for snapshotting.
+        Only copies list and dict references, so the lock is held briefly."""
+        with self._lock:
+            return {
+                user_id: (list(docs), self.vectorizers.get(user_id),
+                          self.document_vectors.get(user_id), self.embeddings.get(user_id))
+                for user_id, docs in self.memory_store.items()
+            }
+    
+    def snapshot(self, root: str = memory_snapshot.SNAPSHOT_DIR) -> Dict:
+        """Write a binary snapshot; writes keep flowing while it serializes."""
+        return memory_snapshot.write_snapshot(self.capture(), root)
+    
+    def restore(self, root: str = memory_snapshot.SNAPSHOT_DIR, owns=None) -> Dict:
+        """Load the latest snapshots under `root` without re-vectorizing.
+
+        Snapshots written by shard workers are read too, newest copy of each
+        user winning, so switching MEMORY_SHARDS keeps every user. TF-IDF
+        matrices and embeddings stay memory-mapped until a write replaces them.
+        """
+        t0 = time.perf_counter()
+        paths = memory_snapshot.snapshot_paths(root)
+        restored = set()
+        for path in paths:
+            snapshot = memory_snapshot.read_snapshot(path, owns)
+            with self._lock:
+                for user_id, (docs, tfidf, embeddings) in snapshot["users"].items():
+                    self.export_user(user_id)
+                    self.memory_store[user_id] = docs
+                    for d in docs:
+                        self.documents[d["id"]] = d
+                    if tfidf is not None:
+                        vocabulary, idf, matrix = tfidf
+                        vectorizer = self._new_vectorizer()
+                        vectorizer.vocabulary_ = vocabulary
+                        vectorizer.idf_ = idf
+                        self.vectorizers[user_id] = vectorizer
+                        self.document_vectors[user_id] = matrix
+                    if embeddings is not None:
+                        self.embeddings[user_id] = embeddings
+                    restored.add(user_id)
+        return {
+            "restored_users": len(restored),
+            "snapshots": [os.path.relpath(p, root) for p in paths],
+            "seconds": round(time.perf_counter() - t0, 4),
+        }
+    
     def get_trends(self, user_id: str, weeks: int = 4) -> Dict:
         if user_id not in self.memory_store:
             return {"error": "No data available"}
@@ -87,11 +334,51 @@ class VectorMemoryStore:
             "data_range": f"Last {weeks} weeks"
         }
 
+# MEMORY_SHARDS > 0 partitions users across worker processes. The sharded
+# store is swapped in by init_memory_store() from the app's startup hook, not
+# at import: shard workers, and uvicorn's --reload / --workers children, all
+# import this module too
+MEMORY_SHARDS = int(os.getenv("MEMORY_SHARDS", 0))
+
 # global instance
 memory_store = VectorMemoryStore()
 
+
+def init_memory_store(n_shards: int = MEMORY_SHARDS):
+    """Start the sharded store when configured; call once per serving process."""
+    global memory_store
+    if n_shards > 0 and isinstance(memory_store, VectorMemoryStore):
+        from backend.tools.memory_shards import ShardedMemoryStore
+        memory_store = ShardedMemoryStore(n_shards)
+    return memory_store
+
 def store_summary(user_id: str, summary: Dict, summary_type: str = "general"):
     memory_store.store_summary(user_id, summary, summary_type)
 
-def query_memory(user_id: str, query: str = None, limit: int = 5):
-    return memory_store.query_memory(user_id, query=query, limit=limit)
+def query_memory(user_id: str, query: str = None, limit: int = 5, mode: str = "hybrid"):
+    return memory_store.query_memory(user_id, query=query, limit=limit, mode=mode)
+
+
+if __name__ == "__main__":
+    # Ingest throughput and query latency, keyword vs hybrid
+    import random
+    words = ("focused coding energized tired meetings review deploy bug email standup "
+             "calm stressed productive sprint planning design docs lunch break walk").split()
+    texts = [" ".join(random.choices(words, k=25)) for _ in range(500)]
+    queries = ["when was I most energized", "days with too many meetings", "stressful deploys"]
+
+    for label, emb in (("keyword", None), ("hybrid", default_embedder)):
+        if emb is not None and not emb.available:
+            print("hybrid: embedding model not found, skipped")
+            continue
+        store = VectorMemoryStore(embedder=emb)
+        t0 = time.perf_counter()
+        for i in range(0, len(texts), 50):
+            store.store_summaries("bench", [{"llm_summary": t} for t in texts[i:i + 50]], "voice_log")
+        ingest = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        for _ in range(20):
+            for q in queries:
+                store.query_memory("bench", q, mode=label)
+        latency = (time.perf_counter() - t0) / (20 * len(queries))
+        print(f"{label}: ingest {len(texts) / ingest:,.0f} docs/s, query {latency * 1000:.2f} ms")
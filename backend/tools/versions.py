@@ -0,0 +1,100 @@
+# versions.py
+
+import asyncio
+import hashlib
+import threading
+import uuid
+from collections import defaultdict
+from typing import Dict, Optional
+
+# What a user's views depend on: "memory" (stored summaries, voice logs) and
+# "events" (calendar, GitHub, email ingested by the sync layer)
+KINDS = ("memory", "events")
+
+
+class VersionTracker:
+    """Per-user change counters, bumped on every memory write and event ingest.
+
+    Views hash the counters they depend on into an ETag, so an unchanged
+    view can answer 304 without being recomputed. Bumps are also pushed to
+    WebSocket subscribers; they may come from worker threads, so delivery
+    goes through each subscriber's event loop.
+    """
+
+    def __init__(self):
+        # Counters restart with the process; the epoch keeps ETags from an
+        # earlier run from matching new content at the same counts
+        self.epoch = uuid.uuid4().hex
+        self._versions = defaultdict(lambda: dict.fromkeys(KINDS, 0))
+        self._subscribers = defaultdict(set)  # user_id -> {(loop, queue)}
+        self._lock = threading.Lock()
+
+    def bump(self, user_id: str, kind: str, item: Optional[Dict] = None):
+        """Record a change; `item` is forwarded to subscribers as-is."""
+        with self._lock:
+            self._versions[user_id][kind] += 1
+            version = dict(self._versions[user_id])
+            subscribers = list(self._subscribers.get(user_id, ()))
+        message = {"kind": kind, "version": version, "item": item}
+        for loop, queue in subscribers:
+            loop.call_soon_threadsafe(queue.put_nowait, message)
+
+    def get(self, user_id: str) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._versions[user_id]) if user_id in self._versions else dict.fromkeys(KINDS, 0)
+
+    def etag(self, user_id: str, *kinds: str, **params) -> str:
+        """Weak ETag over the given counters and any view parameters."""
+        version = self.get(user_id)
+        key = "|".join([self.epoch, user_id] + [f"{k}={version[k]}" for k in kinds]
+                       + [f"{k}={v}" for k, v in sorted(params.items())])
+        return f'W/"{hashlib.sha1(key.encode()).hexdigest()[:20]}"'
+
+    def subscribe(self, user_id: str) -> asyncio.Queue:
+        queue = asyncio.Queue()
+        with self._lock:
+            self._subscribers[user_id].add((asyncio.get_running_loop(), queue))
+        return queue
+
+    def unsubscribe(self, user_id: str, queue: asyncio.Queue):
+        with self._lock:
+            self._subscribers[user_id] = {s for s in self._subscribers[user_id] if s[1] is not queue}
+            if not self._subscribers[user_id]:
+                del self._subscribers[user_id]
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return sum(len(s) for s in self._subscribers.values())
+
+
+def diff_view(old: Dict, new: Dict, key: str = "date") -> Dict:
+    """What changed between two renderings of a view: changed fields, the
+    changed entries of dict fields, and the changed or new points of series
+    (lists of records carrying `key`). Other fields are sent whole."""
+    patch = {}
+    for field, value in new.items():
+        before = old.get(field)
+        if value == before:
+            continue
+        if isinstance(value, dict) and isinstance(before, dict):
+            patch[field] = {k: v for k, v in value.items() if before.get(k) != v}
+        elif isinstance(value, list) and value and all(isinstance(p, dict) and key in p for p in value):
+            previous = {p.get(key): p for p in before or [] if isinstance(p, dict)}
+            patch[field] = [p for p in value if previous.get(p[key]) != p]
+        else:
+            patch[field] = value
+    return patch
+
+
+def if_none_match(header: Optional[str], etag: str) -> bool:
+    """True when an If-None-Match header already names `etag` (weak compare)."""
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    tags = {t.strip().removeprefix("W/") for t in header.split(",")}
+    return etag.removeprefix("W/") in tags
+
+
+# global instance
+versions = VersionTracker()
@@ -1,15 +1,19 @@
+import bisect
 import json
 import logging
 import re
 import textwrap
-from typing import Dict
+from typing import Dict, List
 import random
+import time
 from datetime import datetime
-import google.generativeai as genai
 from dotenv import load_dotenv
 import os
 import openai
-from faster_whisper import WhisperModel
+import numpy as np
+from faster_whisper import WhisperModel, BatchedInferencePipeline, decode_audio
+from faster_whisper.vad import VadOptions, get_speech_timestamps
+from backend.tools.llm_client import llm_client
 
 logging.basicConfig(level=logging.DEBUG)
 
@@ -20,15 +24,35 @@ GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 if not GEMINI_API_KEY:
     raise ValueError("GEMINI_API_KEY not found in environment variables. Please check your .env file.")
 
-genai.configure(api_key=GEMINI_API_KEY)
+MODEL_SIZE = "small"
+COMPUTE_TYPE = "float32"
+BEAM_SIZE = 5
 
-model = WhisperModel("small", compute_type="float32")
-# Instantiate the Gemini model for tagging
-TAGGER_MODEL = genai.GenerativeModel('gemini-2.5-flash')
+model = WhisperModel(MODEL_SIZE, compute_type=COMPUTE_TYPE)
+# Batched pipeline shares the loaded weights; transcribe_batch feeds it the
+# VAD-trimmed speech of every file at once so short notes share batches
+batched_model = BatchedInferencePipeline(model=model)
+BATCH_SIZE = 16
+SAMPLE_RATE = 16000
+# Whisper's context window; speech is packed into pieces no longer than this
+CHUNK_SECONDS = 30
+VAD_OPTIONS = VadOptions(max_speech_duration_s=CHUNK_SECONDS, min_silence_duration_ms=160)
+
+DEFAULT_TAGS = {
+    "mood": "other",
+    "duration": "unknown",
+    "activity_type": "other",
+    "energy_level": "unknown",
+    "confidence": 0.0,
+}
+
+def _strip_fences(raw: str) -> str:
+    m = re.search(r"```(?:json)?\s*([\s\S]+?)```", raw)
+    return m.group(1).strip() if m else raw
 
 def transcribe_and_tag(audio_path: str) -> Dict:
     # 1️⃣ Transcribe
-    segments, _ = model.transcribe(audio_path, beam_size=5)
+    segments, _ = model.transcribe(audio_path, beam_size=BEAM_SIZE)
     transcription = " ".join(seg.text for seg in segments).strip()
     logging.debug("🗣️ Transcription: %s", transcription)
 
@@ -53,13 +77,11 @@ def transcribe_and_tag(audio_path: str) -> Dict:
     # 3️⃣ Call Gemini & strip any fences before parsing
     try:
         logging.debug("🔍 Calling Gemini...")
-        resp = TAGGER_MODEL.generate_content(full_prompt)
-        raw = resp.text.strip()
+        raw = llm_client.generate(full_prompt).strip()
         logging.debug("📥 Gemini raw reply:\n%s", raw)
 
         # strip Markdown fences if present
-        m = re.search(r"```(?:json)?\s*([\s\S]+?)```", raw)
-        clean = m.group(1).strip() if m else raw
+        clean = _strip_fences(raw)
 
         logging.debug("🔧 After stripping fences:\n%s", clean)
         tags = json.loads(clean)
@@ -69,13 +91,7 @@ def transcribe_and_tag(audio_path: str) -> Dict:
         logging.error("❌ Tagging failed: %s", e, exc_info=True)
         if 'clean' in locals():
             logging.error("👀 Cleaned text was: %r", clean)
-        tags = {
-            "mood": "other",
-            "duration": "unknown",
-            "activity_type": "other",
-            "energy_level": "unknown",
-            "confidence": 0.0,
-        }
+        tags = dict(DEFAULT_TAGS)
 
     # 4️⃣ Return full result
     result = {
@@ -115,9 +131,7 @@ def extract_activity_insights(transcription_result: Dict) -> Dict:
 
     # Call Gemini for the summary
     try:
-        summary_resp = genai.GenerativeModel("gemini-2.5-flash") \
-                           .generate_content(full_prompt)
-        insight_summary = summary_resp.text.strip()
+        insight_summary = llm_client.generate(full_prompt).strip()
     except Exception:
         insight_summary = "No additional insight available."
 
@@ -132,4 +146,157 @@ def extract_activity_insights(transcription_result: Dict) -> Dict:
         #     "emotional_keywords": [...],
         #     "suggested_category": transcription_result.get("activity_type")
         # }
-    }
\ No newline at end of file
+    }
+
+
+def _speech_pieces(audio: np.ndarray) -> List[np.ndarray]:
+    """Silero-VAD speech of one file, packed into pieces of at most
+    CHUNK_SECONDS so each piece is one decoder input."""
+    pieces, current, length = [], [], 0
+    limit = CHUNK_SECONDS * SAMPLE_RATE
+    for span in get_speech_timestamps(audio, VAD_OPTIONS, sampling_rate=SAMPLE_RATE):
+        speech = audio[span["start"]:span["end"]]
+        if current and length + len(speech) > limit:
+            pieces.append(np.concatenate(current))
+            current, length = [], 0
+        current.append(speech)
+        length += len(speech)
+    if current:
+        pieces.append(np.concatenate(current))
+    return pieces
+
+
+def transcribe_batch(audio_paths: List[str]) -> Dict:
+    """Transcribe many voice logs with batched, VAD-trimmed inference and tag
+    them all in a single Gemini call.
+
+    Speech pieces from every file are laid end to end and decoded in one
+    pipeline call, one clip per piece, so BATCH_SIZE pieces from different
+    files share a forward pass. Returns the enriched results (same shape as
+    extract_activity_insights) plus per-file durations and real-time factors
+    and batch-wide stats. A file that fails to decode gets an error entry in
+    its slot and the rest of the batch carries on.
+    """
+    # 1️⃣ VAD-trim each file, then decode all speech pieces together
+    batch_start = time.perf_counter()
+    transcripts, pieces, owners, clips = [], [], [], []
+    offset = 0
+    for i, path in enumerate(audio_paths):
+        try:
+            audio = decode_audio(path, sampling_rate=SAMPLE_RATE)
+            file_pieces = _speech_pieces(audio)
+        except Exception as e:
+            logging.error("❌ Could not decode %s: %s", path, e)
+            transcripts.append({
+                "audio_file": os.path.basename(path),
+                "texts": [],
+                "error": str(e),
+                "audio_seconds": 0.0,
+                "speech_seconds": 0.0,
+                "chunks": 0,
+            })
+            continue
+        for piece in file_pieces:
+            clips.append({"start": offset / SAMPLE_RATE, "end": (offset + len(piece)) / SAMPLE_RATE})
+            owners.append(i)
+            pieces.append(piece)
+            offset += len(piece)
+        transcripts.append({
+            "audio_file": os.path.basename(path),
+            "texts": [],
+            "audio_seconds": round(len(audio) / SAMPLE_RATE, 2),
+            "speech_seconds": round(sum(len(p) for p in file_pieces) / SAMPLE_RATE, 2),
+            "chunks": len(file_pieces),
+        })
+
+    if pieces:
+        # Clips are in seconds and each one becomes its own decoder input
+        segments, _ = batched_model.transcribe(
+            np.concatenate(pieces), clip_timestamps=clips, batch_size=BATCH_SIZE, vad_filter=False
+        )
+        starts = [c["start"] for c in clips]
+        for seg in segments:
+            piece = max(bisect.bisect_right(starts, (seg.start + seg.end) / 2) - 1, 0)
+            transcripts[owners[piece]]["texts"].append(seg.text)
+    for t in transcripts:
+        t["transcription"] = " ".join(t.pop("texts")).strip()
+    transcribe_elapsed = time.perf_counter() - batch_start
+    logging.debug("🗣️ Batch transcribed %d files (%d chunks) in %.2fs",
+                  len(transcripts), len(pieces), transcribe_elapsed)
+    # Pieces share forward passes, so split the batch time by speech share
+    total_speech = sum(t["speech_seconds"] for t in transcripts)
+    for t in transcripts:
+        elapsed = transcribe_elapsed * t["speech_seconds"] / total_speech if total_speech else 0.0
+        t["transcribe_seconds"] = round(elapsed, 3)
+        t["rtf"] = round(elapsed / t["audio_seconds"], 4) if t["audio_seconds"] else None
+
+    # 2️⃣ One prompt for tags + insight of every transcript
+    system_prompt = textwrap.dedent("""\
+        You MUST reply with exactly one plain JSON array, and nothing else.
+        Do NOT wrap it in markdown, backticks, or any code fence.
+        Return one object per transcript, in the same order, with exactly these keys:
+          index          (the transcript number given below)
+          mood           (positive|neutral|stressed|frustrated|excited|other)
+          duration       (e.g. "30m","2h", or "unknown")
+          activity_type  (deep_work|meetings|communication|distraction|collaboration|other)
+          energy_level   (high|medium|low|unknown)
+          confidence     (float 0.0-1.0)
+          insight_summary (2-3 sentences: what they did, their mood/energy, one actionable suggestion)
+    """).strip()
+    user_prompt = "\n\n".join(
+        f"Transcript {i}:\n\"\"\"\n{t['transcription']}\n\"\"\""
+        for i, t in enumerate(transcripts) if "error" not in t
+    )
+    full_prompt = system_prompt + "\n\n" + user_prompt
+
+    tagged = {}
+    decoded = sum(1 for t in transcripts if "error" not in t)
+    try:
+        if decoded:
+            logging.debug("🔍 Calling Gemini for %d transcripts...", decoded)
+            raw = llm_client.generate(full_prompt).strip()
+            for item in json.loads(_strip_fences(raw)):
+                tagged[int(item.pop("index"))] = item
+    except Exception as e:
+        logging.error("❌ Batch tagging failed: %s", e, exc_info=True)
+
+    # 3️⃣ Merge transcripts with their tags
+    timestamp = datetime.now().isoformat()
+    results = []
+    for i, t in enumerate(transcripts):
+        performance = {k: t[k] for k in ("audio_seconds", "speech_seconds", "chunks", "transcribe_seconds", "rtf")}
+        if "error" in t:
+            results.append({
+                "status": "error",
+                "error": t["error"],
+                "timestamp": timestamp,
+                "audio_file": t["audio_file"],
+                "performance": performance,
+            })
+            continue
+        item = tagged.get(i, {})
+        tags = {k: item.get(k, v) for k, v in DEFAULT_TAGS.items()}
+        results.append({
+            "transcription": t["transcription"],
+            **tags,
+            "timestamp": timestamp,
+            "audio_file": t["audio_file"],
+            "insight_summary": item.get("insight_summary", "No additional insight available."),
+            "performance": performance,
+        })
+
+    total_audio = sum(t["audio_seconds"] for t in transcripts)
+    total_elapsed = time.perf_counter() - batch_start
+    return {
+        "results": results,
+        "performance": {
+            "files": len(transcripts),
+            "failed": len(transcripts) - decoded,
+            "chunks": len(pieces),
+            "audio_seconds": round(total_audio, 2),
+            "speech_seconds": round(sum(t["speech_seconds"] for t in transcripts), 2),
+            "transcribe_seconds": round(transcribe_elapsed, 3),
+            "total_seconds": round(total_elapsed, 3),
+            "rtf": round(transcribe_elapsed / total_audio, 4) if total_audio else None,
+        },
+    }
@@ -2,6 +2,7 @@ import React, { useState, useRef, useEffect, useCallback } from 'react';
 import Dashboard from './components/Dashboard';
 
 const API_BASE = 'http://127.0.0.1:8000';
+const WS_BASE = API_BASE.replace(/^http/, 'ws');
 
 // Helper to extract JSON from ```json ... ``` markdown
 const extractJsonFromMarkdown = (mdString) => {
@@ -148,7 +149,8 @@ const TimeCopApp = () => {
       if (query) url.searchParams.append('query', query);
       url.searchParams.append('limit', '10');
 
-      const res = await fetch(url);
+      // Revalidate with the ETag instead of recomputing unchanged memory
+      const res = await fetch(url, { cache: 'no-cache' });
       if (!res.ok) throw new Error(`HTTP ${res.status}`);
       setMemoryData(await res.json());
       setError('');
@@ -159,6 +161,23 @@ const TimeCopApp = () => {
     }
   };
 
+  // While the memory tab shows recent entries, append newly stored ones as
+  // they are pushed instead of re-querying
+  const showingRecent = activeTab === 'memory' && !!memoryData && !memoryData.query_used;
+  useEffect(() => {
+    if (!showingRecent || !('WebSocket' in window)) return undefined;
+    const socket = new WebSocket(`${WS_BASE}/ws/${userId}?dashboard=false`);
+    socket.onmessage = (event) => {
+      const msg = JSON.parse(event.data);
+      if (msg.type !== 'memory_items') return;
+      setMemoryData(prev => prev && {
+        ...prev,
+        items: [...(prev.items || []), ...msg.items].slice(-10),
+      });
+    };
+    return () => socket.close();
+  }, [showingRecent, userId]);
+
   // Render the Insights section
   const renderInsightsSection = (insights) => {
     if (!insights || typeof insights !== 'object') {
@@ -5,6 +5,15 @@ import {
 } from 'recharts';
 
 const API_BASE = 'http://127.0.0.1:8000';
+const WS_BASE = API_BASE.replace(/^http/, 'ws');
+
+// Merge pushed points into a date-keyed series, keeping the 7-day window
+const mergeSeries = (series, points) => {
+  if (!points) return series;
+  const byDate = Object.fromEntries(series.map(p => [p.date, p]));
+  points.forEach(p => { byDate[p.date] = p; });
+  return Object.values(byDate).sort((a, b) => a.date.localeCompare(b.date)).slice(-7);
+};
 
 export default function Dashboard({ userId }) {
   const [data, setData] = useState({
@@ -19,7 +28,8 @@ export default function Dashboard({ userId }) {
     const fetchDashboard = async () => {
       setLoading(true);
       try {
-        const res = await fetch(`${API_BASE}/dashboard/${userId}`);
+        // no-cache revalidates with the ETag; unchanged data comes back as 304
+        const res = await fetch(`${API_BASE}/dashboard/${userId}`, { cache: 'no-cache' });
         if (!res.ok) throw new Error(`HTTP ${res.status}`);
         const json = await res.json();
         setData(json);
@@ -30,7 +40,36 @@ export default function Dashboard({ userId }) {
         setLoading(false);
       }
     };
-    fetchDashboard();
+
+    if (!('WebSocket' in window)) {
+      fetchDashboard();
+      return undefined;
+    }
+    // Live channel: one full snapshot, then only the points that changed
+    let received = false;
+    const socket = new WebSocket(`${WS_BASE}/ws/${userId}?memory=false`);
+    socket.onmessage = (event) => {
+      const msg = JSON.parse(event.data);
+      if (msg.type === 'snapshot') {
+        received = true;
+        setData(msg);
+        setError('');
+        setLoading(false);
+      } else if (msg.type === 'dashboard_patch') {
+        setData(prev => ({
+          ...prev,
+          ...msg,
+          time_distribution: { ...prev.time_distribution, ...(msg.time_distribution || {}) },
+          focus_trend: mergeSeries(prev.focus_trend, msg.focus_trend),
+          context_switches: mergeSeries(prev.context_switches, msg.context_switches),
+        }));
+      }
+    };
+    // No push channel available: fall back to a plain request
+    socket.onerror = () => {
+      if (!received) fetchDashboard();
+    };
+    return () => socket.close();
   }, [userId]);
 
   // Transform distribution object into array